@@ -3,6 +3,8 @@ from enum import Enum
 class StopType(Enum):
     START = 'start'
     REST = 'rest'
+    # 34 hour restart of the 70 hour cycle
+    RESTART = 'restart'
     FUEL = 'fuel'
     PICKUP = 'pickup'
     DROPOFF = 'dropoff'
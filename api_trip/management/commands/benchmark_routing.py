@@ -0,0 +1,59 @@
+import os
+import random
+import tempfile
+import time
+from django.core.management.base import BaseCommand
+from api_trip.services.road_graph import RoadGraph, build_synthetic_graph, write_road_graph
+
+
+class Command(BaseCommand):
+    help = "Benchmark the local routing engine on a synthetic road graph (no network)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--size", type=int, default=150, help="Grid side length in nodes")
+        parser.add_argument("--queries", type=int, default=200)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        size = options["size"]
+        nodes, edges = build_synthetic_graph(size, size, seed=options["seed"])
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "graph.bin")
+
+            started = time.perf_counter()
+            write_road_graph(path, nodes, edges)
+            build_seconds = time.perf_counter() - started
+
+            started = time.perf_counter()
+            graph = RoadGraph(path)
+            load_seconds = time.perf_counter() - started
+
+            rng = random.Random(options["seed"])
+            coordinates = [
+                (
+                    {"lat": nodes[rng.randrange(len(nodes))][0], "lon": nodes[rng.randrange(len(nodes))][1]},
+                    {"lat": nodes[rng.randrange(len(nodes))][0], "lon": nodes[rng.randrange(len(nodes))][1]},
+                )
+                for _ in range(options["queries"])
+            ]
+
+            # The first query also builds the snapping grid
+            graph.route(*coordinates[0])
+
+            timings = []
+            for start_coords, end_coords in coordinates:
+                started = time.perf_counter()
+                graph.route(start_coords, end_coords)
+                timings.append(time.perf_counter() - started)
+            graph.close()
+
+        timings.sort()
+        self.stdout.write(f"Graph: {len(nodes)} nodes, {len(edges)} edges")
+        self.stdout.write(f"Build: {build_seconds * 1000:.1f} ms, load: {load_seconds * 1000:.2f} ms")
+        self.stdout.write(
+            f"Routes: {len(timings)} queries, "
+            f"mean {sum(timings) / len(timings) * 1000:.2f} ms, "
+            f"p50 {timings[len(timings) // 2] * 1000:.2f} ms, "
+            f"p95 {timings[int(len(timings) * 0.95)] * 1000:.2f} ms"
+        )
@@ -0,0 +1,50 @@
+import random
+import time
+from django.core.management.base import BaseCommand
+from api_trip.services.sequence_optimizer import nearest_neighbour, optimize_sequence, path_cost
+
+
+class Command(BaseCommand):
+    help = "Benchmark multi-stop sequence optimization on synthetic duration matrices"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--stops", type=int, nargs="+", default=[10, 25, 50, 100])
+        parser.add_argument("--runs", type=int, default=10)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+
+        for stop_count in options["stops"]:
+            timings = []
+            improvements = []
+            for _ in range(options["runs"]):
+                matrix, groups = self._synthetic_trip(rng, stop_count)
+
+                started = time.perf_counter()
+                order = optimize_sequence(matrix, groups)
+                timings.append(time.perf_counter() - started)
+
+                greedy_cost = path_cost(matrix, nearest_neighbour(matrix, groups))
+                improvements.append(1 - path_cost(matrix, order) / greedy_cost)
+
+            timings.sort()
+            self.stdout.write(
+                f"{stop_count} stops: mean {sum(timings) / len(timings) * 1000:.1f} ms, "
+                f"max {timings[-1] * 1000:.1f} ms, "
+                f"{sum(improvements) / len(improvements) * 100:.1f}% shorter than nearest-neighbour"
+            )
+
+    def _synthetic_trip(self, rng, stop_count):
+        """Random stops over a 1500 km square, asymmetric road-like durations in seconds"""
+        points = [(rng.uniform(0, 1500), rng.uniform(0, 1500)) for _ in range(stop_count + 2)]
+        matrix = [
+            [
+                0.0 if a is b else ((a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2) ** 0.5 * rng.uniform(1.2, 1.5) / 80 * 3600
+                for b in points
+            ]
+            for a in points
+        ]
+        pickups = list(range(1, stop_count // 2 + 1))
+        dropoffs = list(range(stop_count // 2 + 1, stop_count + 1))
+        return matrix, [[0], pickups, dropoffs, [stop_count + 1]]
@@ -0,0 +1,171 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from api_trip.services.road_graph import build_synthetic_graph, write_road_graph
+
+# Runs in a fresh interpreter so every measurement is a real cold start. The
+# first request plans what-if scenarios, which builds the shared services,
+# geocodes through the pooled HTTP session and routes on the local graph.
+STARTUP_SCRIPT = """
+import json, os, time
+started = time.perf_counter()
+import django
+from django.conf import settings
+settings.DATABASES = {"default": {"ENGINE": "django.db.backends.sqlite3", "NAME": os.environ["BENCHMARK_DATABASE"]}}
+django.setup()
+setup_done = time.perf_counter()
+from django.urls import get_resolver
+get_resolver().url_patterns
+urls_done = time.perf_counter()
+if os.environ.get("BENCHMARK_WARM_UP") == "true":
+    from api_trip.services.registry import warm_up_services
+    warm_up_services()
+warm_up_done = time.perf_counter()
+
+# Not timed: an empty database holding the trip of the first request
+from django.apps import apps
+from django.db import connection
+with connection.schema_editor() as editor:
+    for model in apps.get_app_config("api_trip").get_models():
+        editor.create_model(model)
+from api_trip.models import Trip
+trip = Trip.objects.create(
+    current_location="Start", pickup_location="Pickup", dropoff_location="Dropoff", current_cycle_hours=10
+)
+fixture_done = time.perf_counter()
+
+from django.test import Client
+response = Client().post(f"/api/v1/trips/{trip.pk}/scenarios/", data={}, content_type="application/json")
+first_response = time.perf_counter()
+
+# Not timed: the same request again with nothing memoized, only the cold start costs are gone
+from django.core.cache import cache
+cache.clear()
+trip.pk = None
+trip.save()
+second_started = time.perf_counter()
+second_response = Client().post(f"/api/v1/trips/{trip.pk}/scenarios/", data={}, content_type="application/json")
+second_done = time.perf_counter()
+
+print(json.dumps({
+    "status": response.status_code if response.status_code != 200 else second_response.status_code,
+    "body": response.content.decode()[:500] if response.status_code != 200 else "",
+    "setup": setup_done - started,
+    "urls": urls_done - setup_done,
+    "warm_up": warm_up_done - urls_done,
+    "first_request": first_response - fixture_done,
+    "warm_request": second_done - second_started,
+    "total": (warm_up_done - started) + (first_response - fixture_done),
+}))
+"""
+
+
+def _geocode_handler(locations):
+    class GeocodeHandler(BaseHTTPRequestHandler):
+        """Answers OpenCage shaped geocodes for the benchmark locations"""
+
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query).get("q", [""])[0]
+            lat, lon = locations[query]
+            body = json.dumps({"results": [{"geometry": {"lat": lat, "lng": lon}, "formatted": query}]}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return GeocodeHandler
+
+
+class Command(BaseCommand):
+    help = "Measure cold-start import time and time to the first successful planning request (no network)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=5)
+        parser.add_argument("--warm-up", action="store_true", help="Run the service warm-up hooks before the request")
+        parser.add_argument("--top-imports", type=int, default=0, help="Also list the N slowest module imports")
+        parser.add_argument("--graph-size", type=int, default=150, help="Side length of the synthetic road graph")
+
+    def handle(self, *args, **options):
+        size = options["graph_size"]
+        nodes, edges = build_synthetic_graph(size, size)
+        locations = {"Start": nodes[0], "Pickup": nodes[len(nodes) // 2], "Dropoff": nodes[-1]}
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _geocode_handler(locations))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                graph_path = os.path.join(directory, "graph.bin")
+                write_road_graph(graph_path, nodes, edges)
+
+                env = dict(
+                    os.environ,
+                    DJANGO_SETTINGS_MODULE=os.environ.get(
+                        "DJANGO_SETTINGS_MODULE", "spotter_trip_planner_eld_django_backend.settings"
+                    ),
+                    BENCHMARK_WARM_UP="true" if options["warm_up"] else "false",
+                    ROUTING_BACKEND="local",
+                    ROUTING_GRAPH_PATH=graph_path,
+                    GEOCODE_URL=f"http://127.0.0.1:{server.server_address[1]}/geocode",
+                )
+
+                runs = []
+                for run_index in range(options["runs"]):
+                    env["BENCHMARK_DATABASE"] = os.path.join(directory, f"run_{run_index}.sqlite3")
+                    runs.append(self._run(env))
+
+                if options["top_imports"]:
+                    env["BENCHMARK_DATABASE"] = os.path.join(directory, "imports.sqlite3")
+                    self._print_top_imports(env, options["top_imports"])
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        for key in ("setup", "urls", "warm_up", "first_request", "warm_request", "total"):
+            timings = sorted(run[key] for run in runs)
+            self.stdout.write(
+                f"{key:>14}: median {timings[len(timings) // 2] * 1000:.1f} ms, "
+                f"min {timings[0] * 1000:.1f} ms, max {timings[-1] * 1000:.1f} ms"
+            )
+        # What lazy construction left for the first request to pay, and --warm-up moves earlier
+        cold_costs = sorted(run["first_request"] - run["warm_request"] for run in runs)
+        self.stdout.write(f"{'cold_start':>14}: median {cold_costs[len(cold_costs) // 2] * 1000:.1f} ms")
+
+    def _run(self, env):
+        result = subprocess.run(
+            [sys.executable, "-c", STARTUP_SCRIPT],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            raise CommandError(result.stderr)
+        run = json.loads(result.stdout.strip().splitlines()[-1])
+        if run["status"] != 200:
+            raise CommandError(f"First request failed with status {run['status']}: {run['body']}")
+        return run
+
+    def _print_top_imports(self, env, count):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", STARTUP_SCRIPT],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True
+        )
+        imports = []
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            _, cumulative, module = line[len("import time:"):].split("|")
+            imports.append((int(cumulative), module.strip()))
+
+        self.stdout.write("Slowest imports (cumulative):")
+        for cumulative, module in sorted(imports, reverse=True)[:count]:
+            self.stdout.write(f"{cumulative / 1000:>10.1f} ms  {module}")
@@ -0,0 +1,52 @@
+import csv
+from django.core.management.base import BaseCommand, CommandError
+from api_trip.services.road_graph import build_synthetic_graph, write_road_graph
+
+
+class Command(BaseCommand):
+    help = "Build a road graph file for the local routing backend"
+
+    def add_arguments(self, parser):
+        parser.add_argument("output", help="Path of the graph file to write")
+        parser.add_argument("--nodes", help="CSV with id,lat,lon columns")
+        parser.add_argument("--edges", help="CSV with source,target,distance,duration columns (meters, seconds)")
+        parser.add_argument("--synthetic", metavar="ROWSxCOLS", help="Build a synthetic grid network instead")
+
+    def handle(self, *args, **options):
+        if options["synthetic"]:
+            try:
+                rows, cols = (int(size) for size in options["synthetic"].lower().split("x"))
+            except ValueError:
+                raise CommandError("--synthetic expects ROWSxCOLS, e.g. 200x200")
+            nodes, edges = build_synthetic_graph(rows, cols)
+        elif options["nodes"] and options["edges"]:
+            nodes, edges = self._read_csv(options["nodes"], options["edges"])
+        else:
+            raise CommandError("Provide --nodes and --edges, or --synthetic")
+
+        try:
+            write_road_graph(options["output"], nodes, edges)
+        except ValueError as error:
+            raise CommandError(str(error))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {len(nodes)} nodes and {len(edges)} edges to {options['output']}"
+        ))
+
+    def _read_csv(self, nodes_path, edges_path):
+        node_index = {}
+        nodes = []
+        with open(nodes_path, newline="") as nodes_file:
+            for row in csv.DictReader(nodes_file):
+                node_index[row["id"]] = len(nodes)
+                nodes.append((float(row["lat"]), float(row["lon"])))
+
+        edges = []
+        with open(edges_path, newline="") as edges_file:
+            for row in csv.DictReader(edges_file):
+                try:
+                    source, target = node_index[row["source"]], node_index[row["target"]]
+                except KeyError as error:
+                    raise CommandError(f"Edge references unknown node {error}")
+                edges.append((source, target, float(row["distance"]), float(row["duration"])))
+        return nodes, edges
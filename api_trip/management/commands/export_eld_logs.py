@@ -0,0 +1,39 @@
+import datetime
+import sys
+import time
+from django.core.management.base import BaseCommand, CommandError
+from api_trip.services.eld_export_service import EXPORT_FORMATS, ELDExportService
+
+
+class Command(BaseCommand):
+    help = "Export the ELD logs of a date range as CSV or NDJSON, one row per log event"
+
+    def add_arguments(self, parser):
+        parser.add_argument("start_date", type=datetime.date.fromisoformat, help="YYYY-MM-DD")
+        parser.add_argument("end_date", type=datetime.date.fromisoformat, help="YYYY-MM-DD")
+        parser.add_argument("--format", dest="export_format", choices=EXPORT_FORMATS, default="csv")
+        parser.add_argument("--carrier", help="Only export the logs of this carrier")
+        parser.add_argument("--output", help="File to write, standard output when omitted")
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        if options["start_date"] > options["end_date"]:
+            raise CommandError("start_date must be before end_date")
+
+        export_service = ELDExportService(chunk_size=options["chunk_size"])
+        chunks = export_service.iter_export(
+            options["start_date"], options["end_date"], options["export_format"], options["carrier"]
+        )
+
+        started = time.perf_counter()
+        output = open(options["output"], "w", newline="") if options["output"] else sys.stdout
+        try:
+            for chunk in chunks:
+                output.write(chunk)
+        finally:
+            if options["output"]:
+                output.close()
+
+        elapsed = time.perf_counter() - started
+        rows = export_service.exported_rows
+        self.stderr.write(f"Exported {rows} rows in {elapsed:.1f}s ({rows / elapsed if elapsed else 0:.0f} rows/s)")
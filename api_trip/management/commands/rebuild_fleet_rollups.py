@@ -0,0 +1,19 @@
+import time
+from django.core.management.base import BaseCommand
+from api_trip.services.registry import get_rollup_service
+
+
+class Command(BaseCommand):
+    help = "Correct the daily and weekly fleet rollups from the stored ELD logs, without blocking planning"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        result = get_rollup_service().rebuild(chunk_size=options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {result['daily_rollups']} daily and {result['weekly_rollups']} weekly rollups "
+            f"against {result['logs']} logs, corrected {result['corrected_rollups']}, "
+            f"in {time.perf_counter() - started:.1f}s"
+        ))
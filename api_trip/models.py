@@ -6,11 +6,25 @@ class Trip(models.Model):
     pickup_location = models.CharField(max_length=255)
     dropoff_location = models.CharField(max_length=255)
     current_cycle_hours = models.FloatField()
+    plan_hash = models.CharField(max_length=64, null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     
     def __str__(self):
         return f"Trip from {self.current_location} to {self.dropoff_location}"
 
+class TripWaypoint(models.Model):
+    trip = models.ForeignKey(Trip, related_name='waypoints', on_delete=models.CASCADE)
+    location = models.CharField(max_length=255)
+    stop_type = models.CharField(
+        max_length=50,
+        choices=[(StopType.PICKUP.value, StopType.PICKUP.name), (StopType.DROPOFF.value, StopType.DROPOFF.name)],
+    )
+    # Position in the optimized visiting order, set when the trip is planned
+    sequence = models.PositiveIntegerField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"{self.stop_type} waypoint at {self.location}"
+
 class RouteStop(models.Model):
     trip = models.ForeignKey(Trip, related_name='stops', on_delete=models.CASCADE)
     location = models.CharField(max_length=255)
@@ -29,5 +43,48 @@ class ELDLog(models.Model):
     date = models.DateField()
     log_data = models.JSONField()
     
+    class Meta:
+        indexes = [models.Index(fields=['date', 'id'])]
+    
     def __str__(self):
         return f"Log for {self.date}"
+
+class FleetDailyRollup(models.Model):
+    carrier = models.CharField(max_length=255)
+    date = models.DateField()
+    log_count = models.IntegerField(default=0)
+    miles_driven = models.FloatField(default=0)
+    driving_hours = models.FloatField(default=0)
+    on_duty_hours = models.FloatField(default=0)
+    violations = models.IntegerField(default=0)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['carrier', 'date'], name='unique_fleet_daily_rollup'),
+        ]
+        indexes = [models.Index(fields=['date'])]
+    
+    def __str__(self):
+        return f"{self.carrier} rollup for {self.date}"
+
+class FleetWeeklyRollup(models.Model):
+    carrier = models.CharField(max_length=255)
+    # Monday of the ISO week
+    week_start = models.DateField()
+    iso_year = models.IntegerField()
+    iso_week = models.IntegerField()
+    log_count = models.IntegerField(default=0)
+    miles_driven = models.FloatField(default=0)
+    driving_hours = models.FloatField(default=0)
+    on_duty_hours = models.FloatField(default=0)
+    violations = models.IntegerField(default=0)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['carrier', 'week_start'], name='unique_fleet_weekly_rollup'),
+        ]
+        indexes = [models.Index(fields=['week_start'])]
+    
+    def __str__(self):
+        return f"{self.carrier} rollup for week {self.iso_year}-W{self.iso_week:02d}"
+
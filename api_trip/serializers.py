@@ -1,5 +1,13 @@
+from django.conf import settings
 from rest_framework import serializers
-from .models import Trip, RouteStop, ELDLog
+from .services.eld_export_service import EXPORT_FORMATS
+from .models import Trip, TripWaypoint, RouteStop, ELDLog, FleetDailyRollup, FleetWeeklyRollup
+
+class TripWaypointSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TripWaypoint
+        fields = ['id', 'location', 'stop_type', 'sequence']
+        read_only_fields = ['sequence']
 
 class RouteStopSerializer(serializers.ModelSerializer):
     class Meta:
@@ -12,10 +20,73 @@ class ELDLogSerializer(serializers.ModelSerializer):
         fields = ['id', 'date', 'log_data']
 
 class TripSerializer(serializers.ModelSerializer):
+    waypoints = TripWaypointSerializer(many=True, required=False)
     stops = RouteStopSerializer(many=True, read_only=True)
     eld_logs = ELDLogSerializer(many=True, read_only=True)
     
     class Meta:
         model = Trip
         fields = ['id', 'current_location', 'pickup_location', 'dropoff_location', 
-                  'current_cycle_hours', 'created_at', 'stops', 'eld_logs']
\ No newline at end of file
+                  'current_cycle_hours', 'created_at', 'waypoints', 'stops', 'eld_logs']
+    
+    def create(self, validated_data):
+        waypoints = validated_data.pop('waypoints', [])
+        trip = super().create(validated_data)
+        for waypoint in waypoints:
+            TripWaypoint.objects.create(trip=trip, **waypoint)
+        return trip
+    
+    def update(self, instance, validated_data):
+        waypoints = validated_data.pop('waypoints', None)
+        trip = super().update(instance, validated_data)
+        if waypoints is not None:
+            trip.waypoints.all().delete()
+            for waypoint in waypoints:
+                TripWaypoint.objects.create(trip=trip, **waypoint)
+        return trip
+
+class TripScenarioRequestSerializer(serializers.Serializer):
+    departure_times = serializers.ListField(child=serializers.DateTimeField(), required=False, allow_empty=False)
+    current_cycle_hours = serializers.ListField(
+        child=serializers.FloatField(min_value=0, max_value=70), required=False, allow_empty=False
+    )
+    
+    def validate(self, data):
+        scenario_count = len(data.get('departure_times', [None])) * len(data.get('current_cycle_hours', [None]))
+        if scenario_count > settings.MAX_TRIP_SCENARIOS:
+            raise serializers.ValidationError(
+                f"At most {settings.MAX_TRIP_SCENARIOS} scenarios can be evaluated at once, got {scenario_count}"
+            )
+        return data
+
+class TripScenarioSerializer(serializers.Serializer):
+    departure_time = serializers.DateTimeField()
+    current_cycle_hours = serializers.FloatField()
+    eta = serializers.DateTimeField()
+    rest_stops = serializers.IntegerField()
+    restart_stops = serializers.IntegerField()
+    fuel_stops = serializers.IntegerField()
+    violations = serializers.ListField(child=serializers.DictField())
+
+class ELDLogExportQuerySerializer(serializers.Serializer):
+    start_date = serializers.DateField()
+    end_date = serializers.DateField()
+    # Not named "format", DRF uses that query parameter to pick a renderer
+    export_format = serializers.ChoiceField(choices=EXPORT_FORMATS, default="csv")
+    carrier = serializers.CharField(required=False)
+    
+    def validate(self, data):
+        if data['start_date'] > data['end_date']:
+            raise serializers.ValidationError("start_date must be before end_date")
+        return data
+
+class FleetDailyRollupSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = FleetDailyRollup
+        fields = ['carrier', 'date', 'log_count', 'miles_driven', 'driving_hours', 'on_duty_hours', 'violations']
+
+class FleetWeeklyRollupSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = FleetWeeklyRollup
+        fields = ['carrier', 'week_start', 'iso_year', 'iso_week', 'log_count', 'miles_driven',
+                  'driving_hours', 'on_duty_hours', 'violations']
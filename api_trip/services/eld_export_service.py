@@ -0,0 +1,100 @@
+import csv
+import io
+import json
+from django.db.models import Q
+from ..models import ELDLog
+
+EXPORT_FORMATS = ("csv", "ndjson")
+
+EXPORT_COLUMNS = [
+    "log_id", "trip_id", "date", "carrier", "driver_name", "driver_id", "truck_number",
+    "trailer_numbers", "shipping_doc", "certification",
+    "event_index", "time", "status", "location", "odometer", "remarks",
+]
+
+
+class ELDExportService:
+    """Streams ELD logs of a date range, one row per log event
+
+    Logs are read in keyset-paginated chunks ordered by (date, id), so memory
+    stays bounded by the chunk size whatever the size of the range.
+    """
+
+    def __init__(self, chunk_size=2000):
+        self.chunk_size = chunk_size
+        # Rows written by the last iter_export, a CSV row may span several lines
+        self.exported_rows = 0
+
+    def iter_logs(self, start_date, end_date, carrier=None):
+        """Yield (id, trip_id, date, log_data) for every log in the range"""
+        queryset = ELDLog.objects.filter(date__range=(start_date, end_date))
+        if carrier:
+            queryset = queryset.filter(log_data__carrier=carrier)
+        queryset = queryset.order_by('date', 'id').values_list('id', 'trip_id', 'date', 'log_data')
+
+        last_date, last_id = None, None
+        while True:
+            chunk = queryset
+            if last_id is not None:
+                chunk = chunk.filter(Q(date__gt=last_date) | Q(date=last_date, id__gt=last_id))
+            logs = list(chunk[:self.chunk_size])
+            if not logs:
+                return
+            yield from logs
+            last_id, _, last_date, _ = logs[-1]
+
+    def iter_rows(self, start_date, end_date, carrier=None):
+        """Yield one flat dict per log event"""
+        for log_id, trip_id, date, log_data in self.iter_logs(start_date, end_date, carrier):
+            header = {
+                "log_id": log_id,
+                "trip_id": trip_id,
+                "date": date.isoformat(),
+                "carrier": log_data.get("carrier"),
+                "driver_name": log_data.get("driver_name"),
+                "driver_id": log_data.get("driver_id"),
+                "truck_number": log_data.get("truck_number"),
+                "trailer_numbers": log_data.get("trailer_numbers"),
+                "shipping_doc": log_data.get("shipping_doc"),
+                "certification": log_data.get("certification"),
+            }
+            for index, event in enumerate(log_data.get("events", [])):
+                row = dict(header)
+                row["event_index"] = index
+                row["time"] = event.get("time")
+                row["status"] = event.get("status")
+                row["location"] = event.get("location")
+                row["odometer"] = event.get("odometer")
+                row["remarks"] = event.get("remarks")
+                yield row
+
+    def iter_export(self, start_date, end_date, export_format, carrier=None):
+        """Yield the export as text chunks of the given format"""
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format '{export_format}'")
+
+        self.exported_rows = 0
+        rows = self.iter_rows(start_date, end_date, carrier)
+        if export_format == "csv":
+            yield ",".join(EXPORT_COLUMNS) + "\r\n"
+
+        # Buffer rows so each yielded chunk is large enough to write efficiently
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+        buffered = 0
+        for row in rows:
+            if export_format == "csv":
+                writer.writerow(row)
+            else:
+                buffer.write(json.dumps(row))
+                buffer.write("\n")
+            buffered += 1
+            self.exported_rows += 1
+            if buffered >= self.chunk_size:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+                buffered = 0
+
+        if buffered:
+            yield buffer.getvalue()
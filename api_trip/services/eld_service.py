@@ -7,6 +7,7 @@ class ELDService:
         self.status_map = {
             "start": "ON",    
             "rest": "SB",     
+            "restart": "OFF",
             "fuel": "ON",     
             "pickup": "ON",   
             "dropoff": "ON",  
@@ -0,0 +1,37 @@
+import threading
+from django.conf import settings
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_http_session():
+    """Requests session shared by the worker, its connection pool is reused across requests
+
+    requests is only imported the first time a session is needed.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=settings.HTTP_POOL_SIZE)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+
+def preopen_connections(urls, timeout=2):
+    """Open pooled connections to the given URLs ahead of the first real request"""
+    import requests
+
+    session = get_http_session()
+    for url in urls:
+        try:
+            session.head(url, timeout=timeout)
+        except requests.RequestException as error:
+            print(f"Could not open a connection to {url} => {error}")
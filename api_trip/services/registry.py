@@ -0,0 +1,49 @@
+import threading
+
+_instances = {}
+_lock = threading.Lock()
+
+
+def _get_instance(name, factory):
+    instance = _instances.get(name)
+    if instance is None:
+        with _lock:
+            instance = _instances.get(name)
+            if instance is None:
+                instance = _instances[name] = factory()
+    return instance
+
+
+def get_route_service():
+    """RouteService shared by every request of the worker, built on first use"""
+    from api_trip.services.route_service import RouteService
+    return _get_instance("route_service", RouteService)
+
+
+def get_eld_service():
+    """ELDService shared by every request of the worker, built on first use"""
+    from api_trip.services.eld_service import ELDService
+    return _get_instance("eld_service", ELDService)
+
+
+def get_rollup_service():
+    """RollupService shared by every request of the worker, built on first use"""
+    from api_trip.services.rollup_service import RollupService
+    return _get_instance("rollup_service", RollupService)
+
+
+def get_scenario_service():
+    """ScenarioService shared by every request of the worker, built on first use"""
+    from api_trip.services.scenario_service import ScenarioService
+    # Resolved before taking the registry lock, which is not reentrant
+    route_service = get_route_service()
+    eld_service = get_eld_service()
+    return _get_instance("scenario_service", lambda: ScenarioService(route_service, eld_service))
+
+
+def warm_up_services(open_connections=False):
+    """Build the shared services and prepare their caches before the first request"""
+    get_eld_service()
+    get_rollup_service()
+    get_route_service().warm_up(open_connections=open_connections)
+    get_scenario_service()
@@ -0,0 +1,373 @@
+import heapq
+import math
+import mmap
+import random
+import struct
+from array import array
+
+# File layout (little endian), every section starts on an 8 byte boundary:
+#   header: magic, node count, edge count, max speed (m/s)
+#   node latitudes and longitudes (float64)
+#   forward CSR: offsets (uint32, nodes + 1), targets (uint32), distances in meters (float32), durations in seconds (float32)
+#   reverse CSR: same arrays, used by the backward search
+GRAPH_MAGIC = b"RGRAPH01"
+HEADER_FORMAT = "<8sIId"
+EARTH_RADIUS_METERS = 6371008.8
+
+
+def haversine_meters(lat1, lon1, lat2, lon2):
+    """Great-circle distance in meters between two coordinates"""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+def _build_csr(node_count, edges):
+    """Build CSR arrays from (source, target, distance, duration) tuples"""
+    edges = sorted(edges, key=lambda edge: edge[0])
+    offsets = array("I", [0] * (node_count + 1))
+    for source, _, _, _ in edges:
+        offsets[source + 1] += 1
+    for i in range(node_count):
+        offsets[i + 1] += offsets[i]
+    targets = array("I", (edge[1] for edge in edges))
+    distances = array("f", (edge[2] for edge in edges))
+    durations = array("f", (edge[3] for edge in edges))
+    return [offsets, targets, distances, durations]
+
+
+def write_road_graph(path, nodes, edges):
+    """Write a road graph file
+
+    nodes is a list of (lat, lon), edges a list of directed
+    (source, target, distance_meters, duration_seconds).
+    """
+    node_count = len(nodes)
+    for source, target, _, duration in edges:
+        if not (0 <= source < node_count and 0 <= target < node_count):
+            raise ValueError(f"Edge {source} -> {target} references an unknown node")
+        if duration <= 0:
+            raise ValueError(f"Edge {source} -> {target} must have a positive duration")
+
+    # The A* heuristic divides the straight-line distance by the fastest
+    # straight-line speed of any edge, which keeps it consistent
+    max_speed = max(
+        (haversine_meters(*nodes[source], *nodes[target]) / duration for source, target, _, duration in edges),
+        default=0.0
+    )
+    max_speed = max(max_speed * 1.001, 1.0)
+
+    sections = [
+        array("d", (lat for lat, _ in nodes)),
+        array("d", (lon for _, lon in nodes)),
+    ]
+    sections += _build_csr(node_count, edges)
+    sections += _build_csr(node_count, [(target, source, distance, duration) for source, target, distance, duration in edges])
+
+    with open(path, "wb") as graph_file:
+        header = struct.pack(HEADER_FORMAT, GRAPH_MAGIC, node_count, len(edges), max_speed)
+        graph_file.write(header)
+        position = len(header)
+        for section in sections:
+            padding = _align(position) - position
+            graph_file.write(b"\0" * padding)
+            section_bytes = section.tobytes()
+            graph_file.write(section_bytes)
+            position += padding + len(section_bytes)
+
+
+def build_synthetic_graph(rows, cols, origin=(39.0, -98.0), spacing_degrees=0.01, seed=0):
+    """Build a grid road network with randomized speeds, used for benchmarks"""
+    rng = random.Random(seed)
+    nodes = [
+        (origin[0] + row * spacing_degrees, origin[1] + col * spacing_degrees)
+        for row in range(rows)
+        for col in range(cols)
+    ]
+    edges = []
+    for row in range(rows):
+        for col in range(cols):
+            node = row * cols + col
+            neighbours = []
+            if col + 1 < cols:
+                neighbours.append(node + 1)
+            if row + 1 < rows:
+                neighbours.append(node + cols)
+            for neighbour in neighbours:
+                distance = haversine_meters(*nodes[node], *nodes[neighbour]) * rng.uniform(1.0, 1.3)
+                speed = rng.choice([13.4, 20.1, 26.8, 29.0])
+                edges.append((node, neighbour, distance, distance / speed))
+                edges.append((neighbour, node, distance, distance / speed))
+    return nodes, edges
+
+
+class RoadGraph:
+    """Memory-mapped road graph answering shortest paths by travel time"""
+
+    def __init__(self, path, max_snap_meters=None):
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(self._mmap)
+
+        magic, node_count, edge_count, max_speed = struct.unpack_from(HEADER_FORMAT, buffer, 0)
+        if magic != GRAPH_MAGIC:
+            raise ValueError(f"{path} is not a road graph file")
+
+        self.node_count = node_count
+        self.edge_count = edge_count
+        self.max_speed = max_speed
+
+        position = struct.calcsize(HEADER_FORMAT)
+        sections = []
+        for type_code, item_size, length in [
+            ("d", 8, node_count), ("d", 8, node_count),
+            ("I", 4, node_count + 1), ("I", 4, edge_count), ("f", 4, edge_count), ("f", 4, edge_count),
+            ("I", 4, node_count + 1), ("I", 4, edge_count), ("f", 4, edge_count), ("f", 4, edge_count),
+        ]:
+            position = _align(position)
+            end = position + item_size * length
+            sections.append(buffer[position:end].cast(type_code))
+            position = end
+
+        (self.lat, self.lon,
+         self.offsets, self.targets, self.distances, self.durations,
+         self.rev_offsets, self.rev_targets, self.rev_distances, self.rev_durations) = sections
+
+        self._grid = None
+        self._grid_bounds = None
+        self._grid_size = 0.05
+        # Coordinates farther than this from every node are outside the graph
+        self.max_snap_meters = max_snap_meters
+
+    def warm_up(self):
+        """Build the snapping index now instead of on the first route"""
+        if self._grid is None:
+            self._build_grid()
+
+    def close(self):
+        for attribute in ("lat", "lon", "offsets", "targets", "distances", "durations",
+                          "rev_offsets", "rev_targets", "rev_distances", "rev_durations"):
+            getattr(self, attribute).release()
+        self._mmap.close()
+        self._file.close()
+
+    def _grid_cell(self, lat, lon):
+        return (int(math.floor(lat / self._grid_size)), int(math.floor(lon / self._grid_size)))
+
+    def _build_grid(self):
+        grid = {}
+        for node in range(self.node_count):
+            grid.setdefault(self._grid_cell(self.lat[node], self.lon[node]), []).append(node)
+        self._grid = grid
+        self._grid_bounds = (
+            min(cell[0] for cell in grid), max(cell[0] for cell in grid),
+            min(cell[1] for cell in grid), max(cell[1] for cell in grid),
+        )
+
+    def _ring_cells(self, cell_lat, cell_lon, ring):
+        """Grid cells exactly ring cells away from the center cell"""
+        if ring == 0:
+            yield cell_lat, cell_lon
+            return
+        for d_lon in range(-ring, ring + 1):
+            yield cell_lat - ring, cell_lon + d_lon
+            yield cell_lat + ring, cell_lon + d_lon
+        for d_lat in range(-ring + 1, ring):
+            yield cell_lat + d_lat, cell_lon - ring
+            yield cell_lat + d_lat, cell_lon + ring
+
+    def nearest_node(self, lat, lon):
+        """Snap a coordinate to the closest graph node
+
+        Returns None when the graph is empty or no node lies within
+        max_snap_meters of the coordinate.
+        """
+        if self.node_count == 0:
+            return None
+        if self._grid is None:
+            self._build_grid()
+
+        cell_lat, cell_lon = self._grid_cell(lat, lon)
+        min_lat, max_lat, min_lon, max_lon = self._grid_bounds
+        max_ring = max(
+            abs(cell_lat - min_lat), abs(cell_lat - max_lat),
+            abs(cell_lon - min_lon), abs(cell_lon - max_lon),
+        )
+        max_snap_meters = math.inf if self.max_snap_meters is None else self.max_snap_meters
+        best_node, best_distance = None, math.inf
+
+        # Scan rings of grid cells around the coordinate until no unscanned
+        # cell can hold a node closer than the best one found so far
+        for ring in range(max_ring + 1):
+            for cell in self._ring_cells(cell_lat, cell_lon, ring):
+                for node in self._grid.get(cell, ()):
+                    distance = haversine_meters(lat, lon, self.lat[node], self.lon[node])
+                    if distance < best_distance:
+                        best_node, best_distance = node, distance
+            scanned_lat = min(abs(lat) + (ring + 1) * self._grid_size, 89.0)
+            scanned_meters = ring * self._grid_size * 111000 * math.cos(math.radians(scanned_lat))
+            if best_distance <= scanned_meters or scanned_meters >= max_snap_meters:
+                break
+        return best_node if best_distance <= max_snap_meters else None
+
+    def _heuristic(self, node, lat, lon):
+        return haversine_meters(self.lat[node], self.lon[node], lat, lon) / self.max_speed
+
+    def shortest_path(self, source, target):
+        """Fastest path between two nodes using bidirectional A*
+
+        Both searches run Dijkstra on edge costs reduced by the average
+        potential, so the usual bidirectional stopping rule stays exact.
+        Returns (node list, duration seconds, distance meters) or None.
+        """
+        if source == target:
+            return [source], 0.0, 0.0
+
+        s_lat, s_lon = self.lat[source], self.lon[source]
+        t_lat, t_lon = self.lat[target], self.lon[target]
+
+        def potential(node):
+            return (self._heuristic(node, t_lat, t_lon) - self._heuristic(node, s_lat, s_lon)) / 2
+
+        potentials = {}
+
+        def cached_potential(node):
+            value = potentials.get(node)
+            if value is None:
+                value = potentials[node] = potential(node)
+            return value
+
+        searches = [
+            (self.offsets, self.targets, self.durations, 1),
+            (self.rev_offsets, self.rev_targets, self.rev_durations, -1),
+        ]
+        dist = [{source: 0.0}, {target: 0.0}]
+        parent = [{source: None}, {target: None}]
+        settled = [set(), set()]
+        heaps = [[(0.0, source)], [(0.0, target)]]
+        best_cost, meeting_node = math.inf, None
+
+        while heaps[0] and heaps[1]:
+            if heaps[0][0][0] + heaps[1][0][0] >= best_cost:
+                break
+            side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1
+            cost, node = heapq.heappop(heaps[side])
+            if node in settled[side]:
+                continue
+            settled[side].add(node)
+
+            offsets, targets, durations, sign = searches[side]
+            side_dist, side_parent, other_dist = dist[side], parent[side], dist[1 - side]
+            node_potential = sign * cached_potential(node)
+            for edge in range(offsets[node], offsets[node + 1]):
+                neighbour = targets[edge]
+                reduced = durations[edge] - node_potential + sign * cached_potential(neighbour)
+                new_cost = cost + max(reduced, 0.0)
+                if new_cost < side_dist.get(neighbour, math.inf):
+                    side_dist[neighbour] = new_cost
+                    side_parent[neighbour] = node
+                    heapq.heappush(heaps[side], (new_cost, neighbour))
+                    if neighbour in other_dist and new_cost + other_dist[neighbour] < best_cost:
+                        best_cost = new_cost + other_dist[neighbour]
+                        meeting_node = neighbour
+
+        if meeting_node is None:
+            return None
+
+        path = []
+        node = meeting_node
+        while node is not None:
+            path.append(node)
+            node = parent[0][node]
+        path.reverse()
+        node = parent[1][meeting_node]
+        while node is not None:
+            path.append(node)
+            node = parent[1][node]
+
+        duration, distance = 0.0, 0.0
+        for source_node, target_node in zip(path, path[1:]):
+            edge = self._edge(source_node, target_node)
+            duration += self.durations[edge]
+            distance += self.distances[edge]
+        return path, duration, distance
+
+    def duration_matrix(self, nodes):
+        """Travel durations (seconds) and distances (meters) between every pair of nodes
+
+        Runs one forward Dijkstra per source, stopped once every requested
+        node is settled. Unreachable pairs are None.
+        """
+        wanted = set(nodes)
+        durations, distances = [], []
+        for source in nodes:
+            best = {source: (0.0, 0.0)}
+            heap = [(0.0, 0.0, source)]
+            settled = {}
+            remaining = len(wanted)
+            while heap and remaining:
+                cost, distance, node = heapq.heappop(heap)
+                if node in settled:
+                    continue
+                settled[node] = (cost, distance)
+                if node in wanted:
+                    remaining -= 1
+                for edge in range(self.offsets[node], self.offsets[node + 1]):
+                    neighbour = self.targets[edge]
+                    new_cost = cost + self.durations[edge]
+                    if new_cost < best.get(neighbour, (math.inf,))[0]:
+                        best[neighbour] = (new_cost, distance + self.distances[edge])
+                        heapq.heappush(heap, (new_cost, distance + self.distances[edge], neighbour))
+            durations.append([settled[node][0] if node in settled else None for node in nodes])
+            distances.append([settled[node][1] if node in settled else None for node in nodes])
+        return durations, distances
+
+    def table(self, coordinates):
+        """Duration and distance matrix between coordinates, shaped like an OSRM table response"""
+        nodes = [self.nearest_node(coords["lat"], coords["lon"]) for coords in coordinates]
+        if any(node is None for node in nodes):
+            return {"code": "NoRoute", "message": "A coordinate is outside the local road graph"}
+        durations, distances = self.duration_matrix(nodes)
+        return {"code": "Ok", "durations": durations, "distances": distances}
+
+    def _edge(self, source, target):
+        """Fastest edge index between two adjacent nodes"""
+        best_edge = None
+        for edge in range(self.offsets[source], self.offsets[source + 1]):
+            if self.targets[edge] == target and (best_edge is None or self.durations[edge] < self.durations[best_edge]):
+                best_edge = edge
+        return best_edge
+
+    def route(self, start_coords, end_coords):
+        """Route between two coordinates, shaped like an OSRM route response"""
+        source = self.nearest_node(start_coords["lat"], start_coords["lon"])
+        target = self.nearest_node(end_coords["lat"], end_coords["lon"])
+        if source is None or target is None:
+            return {"code": "NoRoute", "message": "A coordinate is outside the local road graph", "routes": []}
+        result = self.shortest_path(source, target)
+        if result is None:
+            return {"code": "NoRoute", "message": "No route found in the local road graph", "routes": []}
+
+        path, duration, distance = result
+        coordinates = [[self.lon[node], self.lat[node]] for node in path]
+        if len(coordinates) == 1:
+            coordinates.append(coordinates[0])
+        return {
+            "code": "Ok",
+            "routes": [{
+                "distance": distance,
+                "duration": duration,
+                "geometry": {"type": "LineString", "coordinates": coordinates},
+            }],
+            "waypoints": [
+                {"location": coordinates[0]},
+                {"location": coordinates[-1]},
+            ],
+        }
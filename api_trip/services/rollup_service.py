@@ -0,0 +1,192 @@
+import datetime
+from django.db import connection, transaction
+from django.db.models import F, Max, Min, Q
+from ..models import ELDLog, FleetDailyRollup, FleetWeeklyRollup
+
+ROLLUP_METRICS = ("log_count", "miles_driven", "driving_hours", "on_duty_hours", "violations")
+
+
+def _log_metrics(log_data):
+    hours_summary = log_data.get("hours_summary", {})
+    return {
+        "log_count": 1,
+        "miles_driven": log_data.get("miles_driven", 0),
+        "driving_hours": hours_summary.get("driving", 0),
+        "on_duty_hours": hours_summary.get("total_on_duty", 0),
+        "violations": len(log_data.get("hos_violations", [])),
+    }
+
+
+def _week_key(date):
+    iso_year, iso_week, weekday = date.isocalendar()
+    return {
+        "week_start": date - datetime.timedelta(days=weekday - 1),
+        "iso_year": iso_year,
+        "iso_week": iso_week,
+    }
+
+
+class RollupService:
+    """Maintains the per day and per ISO week fleet totals of ELD logs"""
+
+    def _aggregate(self, logs, sign=1, daily=None, weekly=None):
+        """Sum the metrics of (date, log_data) pairs per carrier and day / week"""
+        daily = {} if daily is None else daily
+        weekly = {} if weekly is None else weekly
+        for date, log_data in logs:
+            if isinstance(date, str):
+                date = datetime.date.fromisoformat(date)
+            carrier = log_data.get("carrier", "")
+            week = _week_key(date)
+            for key, totals in (
+                ((carrier, date), daily),
+                ((carrier, week["week_start"], week["iso_year"], week["iso_week"]), weekly),
+            ):
+                metrics = totals.setdefault(key, dict.fromkeys(ROLLUP_METRICS, 0))
+                for metric, value in _log_metrics(log_data).items():
+                    metrics[metric] += sign * value
+        return daily, weekly
+
+    def apply_logs(self, logs, sign=1):
+        """Add (sign=1) or remove (sign=-1) ELD logs from the rollups
+
+        logs is an iterable of (date, log_data). Called from the planning
+        write path, inside its transaction. Rows are written in key order so
+        concurrent writers lock them in the same order.
+        """
+        daily, weekly = self._aggregate(logs, sign)
+        for (carrier, date), delta in sorted(daily.items()):
+            self._upsert(FleetDailyRollup, {"carrier": carrier, "date": date}, {}, delta)
+        for (carrier, week_start, iso_year, iso_week), delta in sorted(weekly.items()):
+            self._upsert(
+                FleetWeeklyRollup,
+                {"carrier": carrier, "week_start": week_start},
+                {"iso_year": iso_year, "iso_week": iso_week},
+                delta
+            )
+
+    def _upsert(self, model, lookup, defaults, delta):
+        """Increment the rollup row by delta in a single statement, creating it when missing
+
+        A removal only decrements an existing row, a missing row never held
+        the removed logs and is not created with negative totals.
+        """
+        if any(value < 0 for value in delta.values()):
+            model.objects.filter(**lookup).update(**{metric: F(metric) + value for metric, value in delta.items()})
+            return
+
+        quote_name = connection.ops.quote_name
+        table = quote_name(model._meta.db_table)
+        values = {**lookup, **defaults, **delta}
+        fields = [model._meta.get_field(name) for name in values]
+        params = [field.get_db_prep_value(values[field.name], connection) for field in fields]
+        metric_columns = [quote_name(model._meta.get_field(metric).column) for metric in delta]
+
+        sql = (
+            f"INSERT INTO {table} ({', '.join(quote_name(field.column) for field in fields)}) "
+            f"VALUES ({', '.join(['%s'] * len(fields))}) "
+        )
+        if connection.vendor == "mysql":
+            sql += "ON DUPLICATE KEY UPDATE " + ", ".join(f"{column} = {column} + %s" for column in metric_columns)
+        else:
+            conflict_columns = ", ".join(quote_name(model._meta.get_field(name).column) for name in lookup)
+            sql += f"ON CONFLICT ({conflict_columns}) DO UPDATE SET " + ", ".join(
+                f"{column} = {table}.{column} + %s" for column in metric_columns
+            )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params + list(delta.values()))
+
+    def rebuild(self, chunk_size=2000):
+        """Correct every rollup from the stored ELD logs, one ISO week per transaction
+
+        Each week's logs and rollups are read from one snapshot, which takes
+        no locks, and the difference is applied as increments. Planning writes
+        made meanwhile are increments too, so they are neither blocked nor lost.
+        """
+        bounds = [
+            ELDLog.objects.aggregate(first=Min('date'), last=Max('date')),
+            FleetDailyRollup.objects.aggregate(first=Min('date'), last=Max('date')),
+            FleetWeeklyRollup.objects.aggregate(first=Min('week_start'), last=Max('week_start')),
+        ]
+        firsts = [bound["first"] for bound in bounds if bound["first"] is not None]
+        lasts = [bound["last"] for bound in bounds if bound["last"] is not None]
+        result = {"logs": 0, "daily_rollups": 0, "weekly_rollups": 0, "corrected_rollups": 0}
+        if not firsts:
+            return result
+
+        week_start = _week_key(min(firsts))["week_start"]
+        while week_start <= max(lasts):
+            for key, count in self._rebuild_week(week_start, chunk_size).items():
+                result[key] += count
+            week_start += datetime.timedelta(days=7)
+        return result
+
+    def _rebuild_week(self, week_start, chunk_size):
+        week_end = week_start + datetime.timedelta(days=6)
+        # Only the first transaction statement may change its isolation level
+        isolate = connection.vendor in ("mysql", "postgresql") and not connection.in_atomic_block
+
+        with transaction.atomic():
+            if isolate:
+                with connection.cursor() as cursor:
+                    cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+
+            daily, weekly = {}, {}
+            queryset = ELDLog.objects.filter(date__range=(week_start, week_end)).order_by('date', 'id')
+            last_date, last_id = None, 0
+            log_count = 0
+            while True:
+                page = queryset
+                if last_date is not None:
+                    page = page.filter(Q(date__gt=last_date) | Q(date=last_date, id__gt=last_id))
+                logs = list(page.values_list('id', 'date', 'log_data')[:chunk_size])
+                if not logs:
+                    break
+                self._aggregate(((date, log_data) for _, date, log_data in logs), daily=daily, weekly=weekly)
+                last_id, last_date = logs[-1][0], logs[-1][1]
+                log_count += len(logs)
+
+            live_daily = {
+                (row.pop("carrier"), row.pop("date")): row
+                for row in FleetDailyRollup.objects.filter(date__range=(week_start, week_end)).values(
+                    "carrier", "date", *ROLLUP_METRICS
+                )
+            }
+            live_weekly = {
+                (row.pop("carrier"), row.pop("week_start"), row.pop("iso_year"), row.pop("iso_week")): row
+                for row in FleetWeeklyRollup.objects.filter(week_start=week_start).values(
+                    "carrier", "week_start", "iso_year", "iso_week", *ROLLUP_METRICS
+                )
+            }
+
+            corrected = 0
+            for (carrier, date), correction in self._corrections(daily, live_daily):
+                self._upsert(FleetDailyRollup, {"carrier": carrier, "date": date}, {}, correction)
+                corrected += 1
+            for (carrier, week_start, iso_year, iso_week), correction in self._corrections(weekly, live_weekly):
+                self._upsert(
+                    FleetWeeklyRollup,
+                    {"carrier": carrier, "week_start": week_start},
+                    {"iso_year": iso_year, "iso_week": iso_week},
+                    correction
+                )
+                corrected += 1
+
+        return {
+            "logs": log_count,
+            "daily_rollups": len(daily),
+            "weekly_rollups": len(weekly),
+            "corrected_rollups": corrected,
+        }
+
+    def _corrections(self, expected, live):
+        """(key, delta) turning each live rollup into its expected totals, skipping correct ones"""
+        for key in sorted(set(expected) | set(live)):
+            delta = {
+                metric: expected.get(key, {}).get(metric, 0) - live.get(key, {}).get(metric, 0)
+                for metric in ROLLUP_METRICS
+            }
+            # Float sums differ in their last bits depending on the order they were added in
+            delta = {metric: value if abs(value) > 1e-6 else 0 for metric, value in delta.items()}
+            if any(delta.values()):
+                yield key, delta
@@ -1,21 +1,83 @@
-import requests
 import datetime
-import os
+import hashlib
+import json
+from django.conf import settings
+from django.core.cache import cache
+from django.db import OperationalError, transaction
 from ..enums import StopType
-from ..models import RouteStop, ELDLog
-from api_trip.services.eld_service import ELDService
+from ..models import Trip, RouteStop, ELDLog
+from api_trip.services.http import get_http_session, preopen_connections
+from api_trip.services.registry import get_eld_service, get_rollup_service
+from api_trip.services.routing_backends import RoutingError, get_routing_backend
+from api_trip.services.single_flight import SingleFlight
 
-OPENCAGE_API_KEY = os.getenv("OPENCAGE_API_KEY", default="")
+# Shared by every RouteService so duplicate requests in this worker coalesce
+_planning_flight = SingleFlight()
+
+# Matrix duration filled in for unreachable pairs that no valid order can use
+UNREACHABLE_DURATION = 1e9
+
+
+def _hash_inputs(inputs):
+    payload = json.dumps(inputs, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _normalize_location(location):
+    return " ".join(location.split()).lower()
+
+
+def _sorted_waypoints(trip):
+    """Trip waypoints in the canonical order used for hashing and the route matrix"""
+    return sorted(
+        trip.waypoints.all(),
+        key=lambda waypoint: (_normalize_location(waypoint.location), waypoint.stop_type, waypoint.id)
+    )
+
+
+def compute_route_hash(trip):
+    """Hash of the trip locations, identifies the geocoding and routing work"""
+    return _hash_inputs({
+        "current_location": _normalize_location(trip.current_location),
+        "pickup_location": _normalize_location(trip.pickup_location),
+        "dropoff_location": _normalize_location(trip.dropoff_location),
+        "waypoints": [
+            [_normalize_location(waypoint.location), waypoint.stop_type]
+            for waypoint in _sorted_waypoints(trip)
+        ],
+    })
+
+
+def compute_plan_hash(trip):
+    """Hash of every trip input the plan depends on (locations and cycle hours)"""
+    return _hash_inputs({
+        "route": compute_route_hash(trip),
+        "current_cycle_hours": float(trip.current_cycle_hours),
+    })
 
 class RouteService:
     def __init__(self):
-        self.osrm_base_url = "http://router.project-osrm.org/route/v1/driving"
-        self.geocode_base_url = "https://api.opencagedata.com/geocode/v1/json"
-        self.api_key = OPENCAGE_API_KEY
+        self.osrm_base_url = settings.OSRM_BASE_URL
+        self.routing_backend = get_routing_backend()
+        self.geocode_base_url = settings.GEOCODE_URL
+        self.api_key = settings.OPENCAGE_API_KEY
         self.add_time_for_pickup = 1
         self.add_time_for_dropoff = 1
         self.add_time_for_fuel_stop = 0.5
         self.add_time_for_rest_stop = 10
+        self.add_time_for_cycle_restart = 34
+        self.total_available_drive_time = 70.0
+        
+    
+    def warm_up(self, open_connections=False):
+        """Prepare the routing backend and HTTP pool before the first request"""
+        self.routing_backend.warm_up()
+        get_http_session()
+        if open_connections:
+            urls = [self.geocode_base_url]
+            if settings.ROUTING_BACKEND == "osrm":
+                urls.append(self.osrm_base_url)
+            preopen_connections(urls)
         
 
     def geocode(self, givenLocation):
@@ -27,9 +89,14 @@ class RouteService:
 
         print(f"Geocode request URL => {url}?q={givenLocation}&key={self.api_key}")
 
-        response = requests.get(url, params=params)
+        import requests
 
-        data = response.json()
+        try:
+            response = get_http_session().get(url, params=params, timeout=settings.GEOCODE_TIMEOUT)
+            data = response.json()
+        except (requests.RequestException, ValueError) as error:
+            print(f"Geocode request failed => {error}")
+            return None
 
         if data and data["results"]:
             result = data["results"][0]
@@ -45,21 +112,157 @@ class RouteService:
     
     def get_route(self, start_coords, end_coords):
         """Get route details between two given coordinates"""
-        url = f"{self.osrm_base_url}/{start_coords['lon']},{start_coords['lat']};{end_coords['lon']},{end_coords['lat']}"
-        print(f"Url for getting route details beetwen the start and end coordinates => {url}")
-        params = {
-            'overview': 'full',
-            'geometries': 'geojson',
-            'steps': 'true'
-        }
-        response = requests.get(url, params=params)
-        route = response.json()
+        route = self.routing_backend.route(start_coords, end_coords)
         """  print(f"Route: {route}") """
         return route
     
     def determine_routes_and_stops(self, trip):
-        """Dertermine complete route with stops"""
-       
+        """Dertermine complete route with stops
+
+        Planning is idempotent: a trip whose stored plan was computed from the
+        same inputs is returned as is, and concurrent requests for the same
+        trip and inputs share a single computation.
+        """
+        plan_hash = compute_plan_hash(trip)
+        return _planning_flight.do(
+            f"plan:{trip.pk}:{plan_hash}",
+            lambda: self._plan_trip_with_retries(trip.pk)
+        )
+    
+    
+    def _plan_trip_with_retries(self, trip_id):
+        """Plan the trip, waiting out another process planning it at the same time"""
+        for _ in range(settings.PLAN_LOCK_ATTEMPTS):
+            try:
+                return self._plan_trip(trip_id)
+            except OperationalError as error:
+                # Lock wait timeout (or deadlock) on the trip row: another
+                # process is planning it, its stored plan may now be ready
+                print(f"Waiting for the trip lock failed => {error}")
+                trip = Trip.objects.get(pk=trip_id)
+                if trip.plan_hash == compute_plan_hash(trip):
+                    return self._get_stored_plan(trip)
+        
+        return {"error": "The trip is being planned by another request, retry later", "retry_later": True}
+    
+    
+    def get_route_details(self, trip):
+        """Geocode and route the trip locations, memoized by location hash"""
+        if trip.waypoints.exists():
+            return self._get_multi_stop_route_details(trip)
+        
+        return self._memoize(
+            f"route_details:{compute_route_hash(trip)}",
+            lambda: self._fetch_route_details(trip)
+        )
+    
+    
+    def _memoize(self, cache_key, fetch):
+        """Cache successful results of fetch, concurrent fetches of a key run once"""
+        def fetch_once():
+            value = cache.get(cache_key)
+            if value is None:
+                value = fetch()
+                if "error" not in value:
+                    cache.set(cache_key, value, settings.ROUTE_CACHE_TIMEOUT)
+            return value
+        
+        return _planning_flight.do(cache_key, fetch_once)
+    
+    
+    def _plan_trip(self, trip_id):
+        """Plan the trip, reusing the stored plan when its inputs are unchanged"""
+        trip = Trip.objects.get(pk=trip_id)
+        if trip.plan_hash == compute_plan_hash(trip):
+            return self._get_stored_plan(trip)
+        
+        # Geocoding and routing are memoized and write nothing, run them
+        # before taking the row lock so it is only held for the writes
+        route_hash = compute_route_hash(trip)
+        route_details = self.get_route_details(trip)
+        if "error" in route_details:
+            return route_details
+        
+        # The row lock makes workers in other processes wait for the plan
+        # being stored instead of storing it a second time
+        with transaction.atomic():
+            trip = Trip.objects.select_for_update().get(pk=trip_id)
+            plan_hash = compute_plan_hash(trip)
+            
+            if trip.plan_hash == plan_hash:
+                return self._get_stored_plan(trip)
+            if compute_route_hash(trip) != route_hash:
+                return {"error": "The trip locations changed while it was being planned, retry later", "retry_later": True}
+            
+            stops = self.plan_stops(trip, route_details)
+            if "legs" in route_details:
+                for waypoint in trip.waypoints.all():
+                    waypoint.sequence = route_details["sequence"].index(waypoint.id)
+                    waypoint.save(update_fields=['sequence'])
+            
+            eld_service = get_eld_service()
+            eld_logs = eld_service.generate_logs(trip, stops)
+            
+            # Inputs changed since the last plan, replace it
+            rollup_service = get_rollup_service()
+            rollup_service.apply_logs(trip.eld_logs.values_list('date', 'log_data'), sign=-1)
+            trip.stops.all().delete()
+            trip.eld_logs.all().delete()
+            
+            for stop_data in stops:
+                RouteStop.objects.create(
+                    trip=trip,
+                    location=stop_data['location'],
+                    arrival_time=stop_data['arrival_time'],
+                    departure_time=stop_data['departure_time'],
+                    stop_type=stop_data['stop_type']
+                )
+            
+            for log_data in eld_logs:
+                ELDLog.objects.create(
+                    trip=trip,
+                    date=datetime.datetime.fromisoformat(log_data['date']),
+                    log_data=log_data['log_data']
+                )
+            rollup_service.apply_logs((log['date'], log['log_data']) for log in eld_logs)
+            
+            trip.plan_hash = plan_hash
+            trip.save(update_fields=['plan_hash'])
+        
+        cache.set(f"plan_details:{plan_hash}", route_details, settings.ROUTE_CACHE_TIMEOUT)
+        
+        return {
+            "route_details": route_details,
+            "stops": stops
+        }
+    
+    
+    def plan_stops(self, trip, route_details, start_time=None, current_cycle_hours=None):
+        """Stops of a trip along already fetched route details, no network call
+
+        start_time and current_cycle_hours override the current time and the
+        trip cycle hours, e.g. to evaluate what-if scenarios.
+        """
+        if "legs" in route_details:
+            return self._determine_leg_stops(trip, route_details["legs"], start_time, current_cycle_hours)
+        return self._determine_stops(trip, route_details, start_time, current_cycle_hours)
+    
+    
+    def _get_stored_plan(self, trip):
+        """Return the already stored plan of a trip without any network call"""
+        stops = list(
+            trip.stops.order_by('arrival_time', 'id').values(
+                'location', 'arrival_time', 'departure_time', 'stop_type'
+            )
+        )
+        return {
+            "route_details": cache.get(f"plan_details:{trip.plan_hash}"),
+            "stops": stops
+        }
+    
+    
+    def _fetch_route_details(self, trip):
+        """Geocode the trip locations and get the routes between them"""
         current_location = self.geocode(trip.current_location)
         pickup_location = self.geocode(trip.pickup_location)
         dropoff_location = self.geocode(trip.dropoff_location)
@@ -67,40 +270,132 @@ class RouteService:
         if not all([current_location, pickup_location, dropoff_location]):
             return {"error": "Failed to get address geo details for one or more locations"}
         
-        routes_from_current_location_to_pickup_location = self.get_route(current_location, pickup_location)
-        routes_from_pickup_location_to_dropoff_location = self.get_route(pickup_location, dropoff_location)
-        
-        route_details = self._determine_routes(routes_from_current_location_to_pickup_location, routes_from_pickup_location_to_dropoff_location)
-        
-        # TODO: Determine stops
-        stops = self._determine_stops(trip, route_details)
+        try:
+            routes_from_current_location_to_pickup_location = self.get_route(current_location, pickup_location)
+            routes_from_pickup_location_to_dropoff_location = self.get_route(pickup_location, dropoff_location)
+        except RoutingError as error:
+            return {"error": f"Failed to get route details: {error}"}
         
-        for stop_data in stops:
-            RouteStop.objects.create(
-                trip=trip,
-                location=stop_data['location'],
-                arrival_time=stop_data['arrival_time'],
-                departure_time=stop_data['departure_time'],
-                stop_type=stop_data['stop_type']
-            )
-            
+        return self._determine_routes(routes_from_current_location_to_pickup_location, routes_from_pickup_location_to_dropoff_location)
         
-        eld_service = ELDService()
-        eld_logs = eld_service.generate_logs(trip, stops)
         
-        for log_data in eld_logs:
-            ELDLog.objects.create(
-                trip=trip,
-                date=datetime.datetime.fromisoformat(log_data['date']),
-                log_data=log_data['log_data']
+    def _get_multi_stop_route_details(self, trip):
+        """Optimize the visiting order of a multi-stop trip and route its legs
+
+        Pickups are visited before the extra dropoffs, the trip dropoff
+        location is always the final stop.
+        """
+        from api_trip.services.sequence_optimizer import adjacent_pairs, optimize_sequence
+        
+        matrix = self._memoize(
+            f"route_matrix:{compute_route_hash(trip)}",
+            lambda: self._fetch_route_matrix(trip)
+        )
+        if "error" in matrix:
+            return matrix
+        
+        # The matrix may be shared with other trips visiting the same
+        # locations, map its points back to this trip's waypoints
+        points = matrix["points"]
+        point_waypoint_ids = [None, None] + [waypoint.id for waypoint in _sorted_waypoints(trip)] + [None]
+        
+        pickups = [i for i, point in enumerate(points) if point["stop_type"] == StopType.PICKUP.value]
+        dropoffs = [i for i, point in enumerate(points[:-1]) if point["stop_type"] == StopType.DROPOFF.value]
+        groups = [[0], pickups, dropoffs, [len(points) - 1]]
+        
+        for from_index, to_index in adjacent_pairs(groups):
+            if matrix["durations"][from_index][to_index] is None:
+                return {
+                    "error": f"No route from {points[from_index]['location']} to {points[to_index]['location']}"
+                }
+        
+        durations = [
+            [UNREACHABLE_DURATION if duration is None else duration for duration in row]
+            for row in matrix["durations"]
+        ]
+        distances = [
+            [0 if distance is None else distance for distance in row]
+            for row in matrix["distances"]
+        ]
+        
+        def build_legs(order):
+            return [
+                {
+                    "location": points[to_index]["location"],
+                    "stop_type": points[to_index]["stop_type"],
+                    "distance": distances[from_index][to_index] / 1000,
+                    "duration": durations[from_index][to_index] / 3600,
+                }
+                for from_index, to_index in zip(order, order[1:])
+            ]
+        
+        def elapsed_hours(order):
+            stops = self._determine_leg_stops(trip, build_legs(order))
+            return (stops[-1]["arrival_time"] - stops[0]["arrival_time"]).total_seconds() / 3600
+        
+        order = optimize_sequence(durations, groups, evaluate=elapsed_hours)
+        
+        legs = build_legs(order)
+        geometries = []
+        for leg, from_index, to_index in zip(legs, order, order[1:]):
+            start_coords, end_coords = points[from_index]["coords"], points[to_index]["coords"]
+            route = self._memoize(
+                "route_leg:" + _hash_inputs([start_coords["lat"], start_coords["lon"], end_coords["lat"], end_coords["lon"]]),
+                lambda: self._fetch_leg(start_coords, end_coords)
             )
+            if "error" in route:
+                return route
+            leg["distance"] = route["distance"] / 1000
+            leg["duration"] = route["duration"] / 3600
+            geometries.append(route["geometry"])
         
         return {
-            "route_details": route_details,
-            "stops": stops
+            "total_distance": sum(leg["distance"] for leg in legs),
+            "total_duration": sum(leg["duration"] for leg in legs),
+            "sequence": [point_waypoint_ids[i] for i in order],
+            "legs": legs,
+            "geometry": {"legs": geometries}
         }
+    
+    
+    def _fetch_route_matrix(self, trip):
+        """Geocode every trip location and get the duration matrix between them"""
+        points = [{"location": trip.current_location, "stop_type": StopType.START.value}]
+        points.append({"location": trip.pickup_location, "stop_type": StopType.PICKUP.value})
+        for waypoint in _sorted_waypoints(trip):
+            points.append({"location": waypoint.location, "stop_type": waypoint.stop_type})
+        points.append({"location": trip.dropoff_location, "stop_type": StopType.DROPOFF.value})
+        
+        for point in points:
+            point["coords"] = self.geocode(point["location"])
+            if not point["coords"]:
+                return {"error": "Failed to get address geo details for one or more locations"}
+        
+        try:
+            table = self.routing_backend.table([point["coords"] for point in points])
+        except RoutingError as error:
+            return {"error": f"Failed to get the duration matrix: {error}"}
         
-        
+        return {
+            "points": points,
+            "durations": table["durations"],
+            "distances": table.get("distances") or [[None] * len(points) for _ in points]
+        }
+    
+    
+    def _fetch_leg(self, start_coords, end_coords):
+        """Route a single leg, keeping only what the plan needs"""
+        try:
+            route = self.get_route(start_coords, end_coords)['routes'][0]
+        except RoutingError as error:
+            return {"error": f"Failed to get route details: {error}"}
+        return {
+            "distance": route['distance'],
+            "duration": route['duration'],
+            "geometry": route['geometry']
+        }
+    
+    
     def _determine_routes(self, routes_from_current_location_to_pickup_location, routes_from_pickup_location_to_dropoff_location):
         """Process route data from OSRM"""
         pickup_route = routes_from_current_location_to_pickup_location['routes'][0]
@@ -134,119 +429,23 @@ class RouteService:
         return route_data
     
     
-    def _determine_stops(self, trip, route_data):
+    def _determine_stops(self, trip, route_data, start_time=None, current_cycle_hours=None):
         """Determines stops based on regulations (HOS)"""
-        stops = []
-        
-        current_time = datetime.datetime.now()
-        
-        total_available_drive_time = 70.0
-        daily_drive_limit = total_available_drive_time / 8 
-        remaining_drive_time = daily_drive_limit - trip.current_cycle_hours
-        remaining_duty_time = 14.0 - trip.current_cycle_hours
-        
-        stops.append({
-            "location": trip.current_location,
-            "arrival_time": current_time,
-            "departure_time": current_time,
-            "stop_type": StopType.START.value,
-        })
-        
-        # Pickup phase
-        pickup_drive_time = route_data["pickup_duration"]
-        
-        print(f"Pickup phase")
-        print(f"Remaining drive time => {str(remaining_drive_time)}")
-        print(f"Remaining duty time => {str(remaining_duty_time)}")
-        print(f"Pickup drive time => {str(pickup_drive_time)}")
-    
-        if pickup_drive_time > remaining_drive_time:
-            rest_stop = self._get_rest_stop(current_time, remaining_drive_time)
-            stops.append(rest_stop["rest_stop"])
-            current_time = rest_stop["current_time"]
-            remaining_drive_time = daily_drive_limit
-            remaining_duty_time = 14.0
-        
-        current_time += datetime.timedelta(hours=pickup_drive_time)
-        remaining_drive_time -= pickup_drive_time
-        remaining_duty_time -= pickup_drive_time
-        
-        stops.append({
-            "location": trip.pickup_location,
-            "arrival_time": current_time,
-            "departure_time": current_time + datetime.timedelta(hours=self.add_time_for_pickup),
-            "stop_type": StopType.PICKUP.value
-        })
-        
-        current_time += datetime.timedelta(hours=self.add_time_for_pickup)
-        remaining_duty_time -= self.add_time_for_pickup
-        
-        
-        # Dropoff phase
-        dropoff_drive_time = route_data["dropoff_duration"]
-        
-        print(f"Dropoff phase")
-        print(f"Remaining drive time => {str(remaining_drive_time)}")
-        print(f"Remaining duty time => {str(remaining_duty_time)}")
-        print(f"Dropoff drive time => {str(dropoff_drive_time)}")
-        
-        total_distance = route_data["total_distance"]
-        fuel_stops_needed = int(total_distance / 1000)
-        
-        print(f"Total distance => {str(total_distance)}")
-        print(f"Fuel stops needed => {str(fuel_stops_needed)}")
-        
-        if fuel_stops_needed > 0:
-            distance_between_stops = total_distance / (fuel_stops_needed + 1)
-            total_trip_drive_time = (pickup_drive_time + dropoff_drive_time)
-            time_between_stops = total_trip_drive_time / (fuel_stops_needed + 1)
-            
-            print(f"Total tripd drive time => {str(distance_between_stops)}")
-            print(f"Time between stops => {str(time_between_stops)}")
-            
-
-            for i in range(fuel_stops_needed):
-                if time_between_stops > remaining_drive_time:
-                    rest_stop = self._get_rest_stop(current_time, remaining_drive_time, rest_location=f"Resting Location {i+1}")
-                    stops.append(rest_stop["rest_stop"])
-                    current_time = rest_stop["current_time"]
-                    remaining_drive_time = daily_drive_limit
-                    remaining_duty_time = 14.0
-
-                fuel_location = f"Fuel Stop {i+1}"
-                current_time += datetime.timedelta(hours=time_between_stops)
-                remaining_drive_time -= time_between_stops
-                remaining_duty_time -= time_between_stops
-
-                stops.append({
-                    "location": fuel_location,
-                    "arrival_time": current_time,
-                    "departure_time": current_time + datetime.timedelta(hours=self.add_time_for_fuel_stop),
-                    "stop_type": StopType.FUEL.value
-                })
-                current_time += datetime.timedelta(hours=self.add_time_for_fuel_stop)
-                remaining_duty_time -= self.add_time_for_fuel_stop
-
-       
-       
-        remaining_drive_to_dropoff = dropoff_drive_time - (fuel_stops_needed * time_between_stops)
-        if remaining_drive_to_dropoff > remaining_drive_time:
-            rest_stop = self._get_rest_stop(current_time, remaining_drive_time, rest_location=f"Final Resting Location")
-            stops.append(rest_stop["rest_stop"])
-            current_time = rest_stop["current_time"]
-            remaining_drive_time = total_available_drive_time
-            remaining_duty_time = 14.0
-
-        current_time += datetime.timedelta(hours=remaining_drive_to_dropoff)
-        
-        stops.append({
-            "location": trip.dropoff_location,
-            "arrival_time": current_time,
-            "departure_time": current_time + datetime.timedelta(hours=self.add_time_for_dropoff),
-            "stop_type": StopType.DROPOFF.value
-        })
-
-        return stops
+        legs = [
+            {
+                "location": trip.pickup_location,
+                "stop_type": StopType.PICKUP.value,
+                "distance": route_data["pickup_distance"],
+                "duration": route_data["pickup_duration"],
+            },
+            {
+                "location": trip.dropoff_location,
+                "stop_type": StopType.DROPOFF.value,
+                "distance": route_data["dropoff_distance"],
+                "duration": route_data["dropoff_duration"],
+            },
+        ]
+        return self._determine_leg_stops(trip, legs, start_time, current_cycle_hours)
     
     
     def _get_rest_stop(self, current_time, remaining_drive_time, rest_duration=10, rest_location="Resting Location"):
@@ -260,3 +459,160 @@ class RouteService:
         }
         current_time += datetime.timedelta(hours=remaining_drive_time + rest_duration)
         return {"current_time":current_time,"rest_stop":rest_stop}
+    
+    
+    def _determine_leg_stops(self, trip, legs, start_time=None, current_cycle_hours=None):
+        """Determines stops along consecutive legs based on regulations (HOS)
+
+        Each leg ends at a pickup or dropoff. Rest stops are inserted when the
+        daily drive time runs out, a 34 hour restart when the 70 hour cycle
+        runs out, and fuel stops every 1000 distance units.
+        """
+        current_time = start_time or datetime.datetime.now()
+        if current_cycle_hours is None:
+            current_cycle_hours = trip.current_cycle_hours
+        
+        daily_drive_limit = self.total_available_drive_time / 8
+        state = {
+            "leg_index": 0,
+            "leg_drive_time": legs[0]["duration"] if legs else 0,
+            "current_time": current_time,
+            "remaining_drive_time": max(daily_drive_limit - current_cycle_hours, 0),
+            "remaining_cycle_time": max(self.total_available_drive_time - current_cycle_hours, 0),
+            "distance_since_fuel": 0,
+        }
+        
+        stops = [{
+            "location": trip.current_location,
+            "arrival_time": current_time,
+            "departure_time": current_time,
+            "stop_type": StopType.START.value,
+        }]
+        stops += self._schedule_legs(legs, state)
+        
+        rest_stops = 0
+        restart_stops = 0
+        fuel_stops = 0
+        for stop in stops:
+            if stop["stop_type"] == StopType.REST.value:
+                rest_stops += 1
+                stop["location"] = f"Resting Location {rest_stops}"
+            elif stop["stop_type"] == StopType.RESTART.value:
+                restart_stops += 1
+                stop["location"] = f"Restart Location {restart_stops}"
+            elif stop["stop_type"] == StopType.FUEL.value:
+                fuel_stops += 1
+                stop["location"] = f"Fuel Stop {fuel_stops}"
+        return stops
+    
+    
+    def _schedule_legs(self, legs, state, memo=None):
+        """Schedule the remaining legs, placing 34 hour restarts where they finish earliest
+
+        A restart pays off either where the 70 hour cycle runs out or in
+        place of one of the 10 hour rests before it, so every such point is
+        tried. Picking the earliest finish keeps the arrival time from ever
+        improving when the driver starts with more cycle hours used.
+        """
+        if memo is None:
+            memo = {}
+        key = tuple(
+            round(state[name], 6) for name in
+            ("leg_index", "leg_drive_time", "remaining_drive_time", "remaining_cycle_time", "distance_since_fuel")
+        )
+        if key in memo:
+            # Same position and clocks, only shifted in time
+            cached_time, cached_stops = memo[key]
+            shift = state["current_time"] - cached_time
+            return [
+                {**stop, "arrival_time": stop["arrival_time"] + shift, "departure_time": stop["departure_time"] + shift}
+                for stop in cached_stops
+            ]
+        
+        stops, restart_points = self._drive_until_cycle_runs_out(legs, state)
+        best = None if restart_points else stops
+        
+        for stop_count, restart_state in reversed(restart_points):
+            restart_time = restart_state["current_time"]
+            restart_state["current_time"] += datetime.timedelta(hours=self.add_time_for_cycle_restart)
+            restart_state["remaining_drive_time"] = self.total_available_drive_time / 8
+            restart_state["remaining_cycle_time"] = self.total_available_drive_time
+            plan = stops[:stop_count] + [{
+                "location": "Restart Location",
+                "arrival_time": restart_time,
+                "departure_time": restart_state["current_time"],
+                "stop_type": StopType.RESTART.value
+            }] + self._schedule_legs(legs, restart_state, memo)
+            if best is None or plan[-1]["departure_time"] < best[-1]["departure_time"]:
+                best = plan
+        
+        memo[key] = (state["current_time"], best)
+        return best
+    
+    
+    def _drive_until_cycle_runs_out(self, legs, state):
+        """Drive the legs taking only 10 hour rests until the trip ends or the cycle runs out
+
+        Returns the stops and, when the cycle ran out, every point where a
+        restart could be taken as (number of stops before it, state there).
+        """
+        stops = []
+        restart_points = []
+        state = dict(state)
+        service_times = {
+            StopType.PICKUP.value: self.add_time_for_pickup,
+            StopType.DROPOFF.value: self.add_time_for_dropoff,
+        }
+        
+        while state["leg_index"] < len(legs):
+            leg = legs[state["leg_index"]]
+            speed = leg["distance"] / leg["duration"] if leg["duration"] > 0 else 0
+            
+            while state["leg_drive_time"] > 1e-9:
+                time_to_fuel = (1000 - state["distance_since_fuel"]) / speed if speed > 0 else float("inf")
+                drive_time = min(
+                    state["leg_drive_time"], state["remaining_drive_time"], state["remaining_cycle_time"], time_to_fuel
+                )
+                state["current_time"] += datetime.timedelta(hours=drive_time)
+                state["leg_drive_time"] -= drive_time
+                state["remaining_drive_time"] -= drive_time
+                state["remaining_cycle_time"] -= drive_time
+                state["distance_since_fuel"] += drive_time * speed
+                
+                if state["leg_drive_time"] <= 1e-9:
+                    break
+                
+                if state["remaining_cycle_time"] <= 1e-9:
+                    restart_points.append((len(stops), state))
+                    return stops, restart_points
+                elif state["remaining_drive_time"] <= 1e-9:
+                    restart_points.append((len(stops), dict(state)))
+                    rest_stop = self._get_rest_stop(state["current_time"], 0)
+                    stops.append(rest_stop["rest_stop"])
+                    state["current_time"] = rest_stop["current_time"]
+                    state["remaining_drive_time"] = self.total_available_drive_time / 8
+                else:
+                    stops.append({
+                        "location": "Fuel Stop",
+                        "arrival_time": state["current_time"],
+                        "departure_time": state["current_time"] + datetime.timedelta(hours=self.add_time_for_fuel_stop),
+                        "stop_type": StopType.FUEL.value
+                    })
+                    state["current_time"] += datetime.timedelta(hours=self.add_time_for_fuel_stop)
+                    state["remaining_cycle_time"] = max(state["remaining_cycle_time"] - self.add_time_for_fuel_stop, 0)
+                    state["distance_since_fuel"] = 0
+            
+            service_time = service_times[leg["stop_type"]]
+            stops.append({
+                "location": leg["location"],
+                "arrival_time": state["current_time"],
+                "departure_time": state["current_time"] + datetime.timedelta(hours=service_time),
+                "stop_type": leg["stop_type"]
+            })
+            state["current_time"] += datetime.timedelta(hours=service_time)
+            state["remaining_cycle_time"] = max(state["remaining_cycle_time"] - service_time, 0)
+            state["leg_index"] += 1
+            if state["leg_index"] < len(legs):
+                state["leg_drive_time"] = legs[state["leg_index"]]["duration"]
+        
+        return stops, []
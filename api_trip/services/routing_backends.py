@@ -0,0 +1,180 @@
+import functools
+import threading
+from django.conf import settings
+from api_trip.services.http import get_http_session
+
+
+class RoutingError(Exception):
+    """Raised when a routing backend cannot answer a route request"""
+
+
+class RoutingBackend:
+    """Interface of the engines able to route between two coordinates
+
+    route() returns an OSRM shaped response: a dict with a "routes" list whose
+    first item holds "distance" (meters), "duration" (seconds) and a GeoJSON
+    "geometry". table() returns "durations" (seconds) and "distances"
+    (meters) matrices between every pair of coordinates, None when a pair
+    is unreachable.
+    """
+
+    name = None
+
+    def route(self, start_coords, end_coords):
+        raise NotImplementedError
+
+    def table(self, coordinates):
+        raise NotImplementedError
+
+    def warm_up(self):
+        """Load whatever the backend needs before its first request"""
+
+
+class OSRMRoutingBackend(RoutingBackend):
+    """Routes through an OSRM HTTP server"""
+
+    name = "osrm"
+
+    def __init__(self, base_url, table_url):
+        self.base_url = base_url
+        self.table_url = table_url
+
+    def route(self, start_coords, end_coords):
+        import requests
+
+        url = f"{self.base_url}/{start_coords['lon']},{start_coords['lat']};{end_coords['lon']},{end_coords['lat']}"
+        print(f"Url for getting route details beetwen the start and end coordinates => {url}")
+        params = {
+            'overview': 'full',
+            'geometries': 'geojson',
+            'steps': 'true'
+        }
+        try:
+            response = get_http_session().get(url, params=params, timeout=settings.OSRM_TIMEOUT)
+            route = response.json()
+        except (requests.RequestException, ValueError) as error:
+            raise RoutingError(f"OSRM request failed: {error}") from error
+
+        if route.get("code") != "Ok" or not route.get("routes"):
+            raise RoutingError(f"OSRM returned no route: {route.get('code')}")
+        return route
+
+    def table(self, coordinates):
+        import requests
+
+        locations = ";".join(f"{coords['lon']},{coords['lat']}" for coords in coordinates)
+        url = f"{self.table_url}/{locations}"
+        print(f"Url for getting the duration matrix => {url}")
+        try:
+            response = get_http_session().get(url, params={'annotations': 'duration,distance'}, timeout=settings.OSRM_TIMEOUT)
+            table = response.json()
+        except (requests.RequestException, ValueError) as error:
+            raise RoutingError(f"OSRM table request failed: {error}") from error
+
+        if table.get("code") != "Ok" or "durations" not in table:
+            raise RoutingError(f"OSRM returned no table: {table.get('code')}")
+        return table
+
+
+class LocalRoutingBackend(RoutingBackend):
+    """Routes in process over a prebuilt memory-mapped road graph file"""
+
+    name = "local"
+
+    def __init__(self, graph_path, max_snap_meters=None):
+        self.graph_path = graph_path
+        self.max_snap_meters = max_snap_meters
+        self._graph = None
+        self._lock = threading.Lock()
+
+    @property
+    def graph(self):
+        if self._graph is None:
+            with self._lock:
+                if self._graph is None:
+                    from api_trip.services.road_graph import RoadGraph
+                    self._graph = RoadGraph(self.graph_path, self.max_snap_meters)
+        return self._graph
+
+    def warm_up(self):
+        self.graph.warm_up()
+
+    def route(self, start_coords, end_coords):
+        try:
+            route = self.graph.route(start_coords, end_coords)
+        except (OSError, ValueError) as error:
+            raise RoutingError(f"Local road graph unavailable: {error}") from error
+
+        if route["code"] != "Ok":
+            raise RoutingError(route["message"])
+        return route
+
+    def table(self, coordinates):
+        try:
+            table = self.graph.table(coordinates)
+        except (OSError, ValueError) as error:
+            raise RoutingError(f"Local road graph unavailable: {error}") from error
+
+        if table["code"] != "Ok":
+            raise RoutingError(table["message"])
+        return table
+
+
+class FallbackRoutingBackend(RoutingBackend):
+    """Tries each backend in order until one answers"""
+
+    name = "fallback"
+
+    def __init__(self, backends):
+        self.backends = backends
+
+    def route(self, start_coords, end_coords):
+        return self._first_success("route", start_coords, end_coords)
+
+    def table(self, coordinates):
+        return self._first_success("table", coordinates)
+
+    def warm_up(self):
+        for backend in self.backends:
+            backend.warm_up()
+
+    def _first_success(self, method, *args):
+        errors = []
+        for backend in self.backends:
+            try:
+                return getattr(backend, method)(*args)
+            except RoutingError as error:
+                print(f"Routing backend {backend.name} failed => {error}")
+                errors.append(f"{backend.name}: {error}")
+        raise RoutingError("All routing backends failed (" + "; ".join(errors) + ")")
+
+
+@functools.lru_cache(maxsize=None)
+def _get_local_backend(graph_path, max_snap_meters):
+    # One mapping of each graph file per worker, shared by every request
+    return LocalRoutingBackend(graph_path, max_snap_meters)
+
+
+def get_routing_backend():
+    """Build the routing backend configured by ROUTING_BACKEND and ROUTING_GRAPH_PATH
+
+    "osrm" uses the OSRM server and, when a road graph is configured, falls
+    back to it if OSRM fails. "local" only uses the road graph.
+    """
+    osrm = OSRMRoutingBackend(settings.OSRM_BASE_URL, settings.OSRM_TABLE_URL)
+    local = (
+        _get_local_backend(settings.ROUTING_GRAPH_PATH, settings.ROUTING_MAX_SNAP_METERS)
+        if settings.ROUTING_GRAPH_PATH else None
+    )
+
+    if settings.ROUTING_BACKEND == "local":
+        if local is None:
+            raise ValueError("ROUTING_BACKEND is 'local' but ROUTING_GRAPH_PATH is not set")
+        return local
+
+    if settings.ROUTING_BACKEND != "osrm":
+        raise ValueError(f"Unknown ROUTING_BACKEND '{settings.ROUTING_BACKEND}'")
+
+    if local is None:
+        return osrm
+    return FallbackRoutingBackend([osrm, local])
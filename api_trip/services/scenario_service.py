@@ -0,0 +1,112 @@
+import datetime
+from ..enums import StopType
+
+# Plans are computed once from this reference time, then shifted to each departure
+REFERENCE_TIME = datetime.datetime(2000, 1, 1)
+
+
+class ScenarioService:
+    def __init__(self, route_service, eld_service):
+        self.route_service = route_service
+        self.eld_service = eld_service
+
+    def evaluate_scenarios(self, trip, departure_times, cycle_hours_values):
+        """Evaluate every departure time x cycle hours combination of a trip
+
+        The route is fetched once. The stop plan only depends on the cycle
+        hours, so it is built once per cycle hours value as a timeline of
+        hour offsets, and each departure time only shifts that timeline.
+        """
+        route_details = self.route_service.get_route_details(trip)
+        if "error" in route_details:
+            return route_details
+
+        scenarios = []
+        for cycle_hours in cycle_hours_values:
+            timeline = self._build_timeline(trip, route_details, cycle_hours)
+            for departure_time in departure_times:
+                scenario = self._evaluate_departure(timeline, departure_time)
+                scenario["current_cycle_hours"] = cycle_hours
+                scenarios.append(scenario)
+
+        return {
+            "route_details": {
+                "total_distance": route_details["total_distance"],
+                "total_duration": route_details["total_duration"],
+            },
+            "scenarios": scenarios
+        }
+
+    def _build_timeline(self, trip, route_details, cycle_hours):
+        """Duty status segments of the trip plan, as parallel arrays of hour offsets"""
+        stops = self.route_service.plan_stops(
+            trip, route_details, start_time=REFERENCE_TIME, current_cycle_hours=cycle_hours
+        )
+
+        def offset(time):
+            return (time - REFERENCE_TIME).total_seconds() / 3600
+
+        starts, ends, statuses = [], [], []
+        for i, stop in enumerate(stops):
+            starts.append(offset(stop["arrival_time"]))
+            ends.append(offset(stop["departure_time"]))
+            statuses.append(self.eld_service.status_map[stop["stop_type"]])
+            if i < len(stops) - 1:
+                starts.append(offset(stop["departure_time"]))
+                ends.append(offset(stops[i + 1]["arrival_time"]))
+                statuses.append(self.eld_service.driving_status)
+
+        return {
+            "starts": starts,
+            "ends": ends,
+            "statuses": statuses,
+            "arrival": offset(stops[-1]["arrival_time"]),
+            "rest_stops": sum(1 for stop in stops if stop["stop_type"] == StopType.REST.value),
+            "restart_stops": sum(1 for stop in stops if stop["stop_type"] == StopType.RESTART.value),
+            "fuel_stops": sum(1 for stop in stops if stop["stop_type"] == StopType.FUEL.value),
+        }
+
+    def _evaluate_departure(self, timeline, departure_time):
+        """ETA, stop counts and daily HOS violations of a timeline leaving at departure_time"""
+        daily_hours = {}
+        for start, end, status in zip(timeline["starts"], timeline["ends"], timeline["statuses"]):
+            if end <= start:
+                continue
+            segment_start = departure_time + datetime.timedelta(hours=start)
+            segment_end = departure_time + datetime.timedelta(hours=end)
+
+            # Split the segment at every midnight it crosses
+            while segment_start < segment_end:
+                next_midnight = datetime.datetime.combine(
+                    segment_start.date() + datetime.timedelta(days=1),
+                    datetime.time(0, 0),
+                    tzinfo=segment_start.tzinfo
+                )
+                day_end = min(segment_end, next_midnight)
+                hours = daily_hours.setdefault(segment_start.date(), {"driving": 0, "on_duty_not_driving": 0})
+                duration = (day_end - segment_start).total_seconds() / 3600
+                if status == self.eld_service.driving_status:
+                    hours["driving"] += duration
+                elif status == "ON":
+                    hours["on_duty_not_driving"] += duration
+                segment_start = day_end
+
+        violations = []
+        for date in sorted(daily_hours):
+            hours = daily_hours[date]
+            hours_summary = {
+                "driving": round(hours["driving"], 2),
+                "total_on_duty": round(hours["driving"] + hours["on_duty_not_driving"], 2),
+            }
+            for violation in self.eld_service._check_hos_violations(hours_summary):
+                violation["date"] = date.isoformat()
+                violations.append(violation)
+
+        return {
+            "departure_time": departure_time,
+            "eta": departure_time + datetime.timedelta(hours=timeline["arrival"]),
+            "rest_stops": timeline["rest_stops"],
+            "restart_stops": timeline["restart_stops"],
+            "fuel_stops": timeline["fuel_stops"],
+            "violations": violations,
+        }
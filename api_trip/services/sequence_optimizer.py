@@ -0,0 +1,124 @@
+def path_cost(matrix, order):
+    """Total cost of visiting the nodes in order"""
+    return sum(matrix[a][b] for a, b in zip(order, order[1:]))
+
+
+def nearest_neighbour(matrix, groups):
+    """Greedy order visiting groups one after the other
+
+    groups is a list of node lists; the first group holds the start node.
+    Nodes are reordered within their group, never across groups.
+    """
+    order = [groups[0][0]]
+    for group in [groups[0][1:]] + list(groups[1:]):
+        remaining = list(group)
+        while remaining:
+            last = order[-1]
+            nearest = min(remaining, key=lambda node: matrix[last][node])
+            remaining.remove(nearest)
+            order.append(nearest)
+    return order
+
+
+def adjacent_pairs(groups):
+    """Every (from, to) pair that can be consecutive in an order respecting the groups"""
+    groups = [group for group in groups if group]
+    pairs = set()
+    for index, group in enumerate(groups):
+        pairs.update((a, b) for a in group for b in group if a != b)
+        if index + 1 < len(groups):
+            pairs.update((a, b) for a in group for b in groups[index + 1])
+    return pairs
+
+
+def _group_ranges(groups):
+    ranges = []
+    position = 0
+    for group in groups:
+        ranges.append((position, position + len(group) - 1))
+        position += len(group)
+    # The start node never moves
+    first_start, first_end = ranges[0]
+    ranges[0] = (first_start + 1, first_end)
+    return [(start, end) for start, end in ranges if end >= start]
+
+
+def _prefix_costs(matrix, order):
+    forward = [0.0]
+    backward = [0.0]
+    for a, b in zip(order, order[1:]):
+        forward.append(forward[-1] + matrix[a][b])
+        backward.append(backward[-1] + matrix[b][a])
+    return forward, backward
+
+
+def _two_opt_pass(matrix, order, ranges):
+    """Apply the first improving segment reversal, costs may be asymmetric"""
+    n = len(order)
+    forward, backward = _prefix_costs(matrix, order)
+    for start, end in ranges:
+        for i in range(start, end):
+            before = order[i - 1]
+            for j in range(i + 1, end + 1):
+                after = order[j + 1] if j + 1 < n else None
+                old = matrix[before][order[i]] + forward[j] - forward[i]
+                new = matrix[before][order[j]] + backward[j] - backward[i]
+                if after is not None:
+                    old += matrix[order[j]][after]
+                    new += matrix[order[i]][after]
+                if new < old - 1e-9:
+                    order[i:j + 1] = reversed(order[i:j + 1])
+                    return True
+    return False
+
+
+def _or_opt_pass(matrix, order, ranges, max_segment=3):
+    """Apply the first improving move of a short segment elsewhere in its group"""
+    n = len(order)
+    for start, end in ranges:
+        for length in range(1, max_segment + 1):
+            for i in range(start, end - length + 2):
+                last = i + length - 1
+                before = order[i - 1]
+                after = order[last + 1] if last + 1 < n else None
+                removed = matrix[before][order[i]]
+                if after is not None:
+                    removed += matrix[order[last]][after] - matrix[before][after]
+
+                for k in range(start - 1, end + 1):
+                    if i - 1 <= k <= last:
+                        continue
+                    a = order[k]
+                    b = order[k + 1] if k + 1 < n else None
+                    added = matrix[a][order[i]]
+                    if b is not None:
+                        added += matrix[order[last]][b] - matrix[a][b]
+                    if added < removed - 1e-9:
+                        segment = order[i:last + 1]
+                        del order[i:last + 1]
+                        insert_at = k + 1 if k < i else k + 1 - length
+                        order[insert_at:insert_at] = segment
+                        return True
+    return False
+
+
+def optimize_sequence(matrix, groups, evaluate=None, max_passes=1000):
+    """Order the nodes of a multi-stop trip
+
+    Builds a nearest-neighbour order, then improves it with 2-opt and
+    Or-opt moves that keep every node inside its group. matrix may be
+    asymmetric. evaluate, when given, scores a full order (e.g. elapsed
+    time once the stop planner has inserted mandated rests) and the
+    improved order is only kept if it does not score worse.
+    """
+    initial = nearest_neighbour(matrix, groups)
+    order = list(initial)
+    ranges = _group_ranges(groups)
+
+    for _ in range(max_passes):
+        if not (_two_opt_pass(matrix, order, ranges) or _or_opt_pass(matrix, order, ranges)):
+            break
+
+    if evaluate is not None and evaluate(order) > evaluate(initial):
+        return initial
+    return order
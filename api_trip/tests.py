@@ -1,3 +1,709 @@
-from django.test import TestCase
+import csv
+import datetime
+import heapq
+import io
+import json
+import math
+import os
+import random
+import tempfile
+import threading
+import time
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from .models import Trip, TripWaypoint, RouteStop, ELDLog, FleetDailyRollup, FleetWeeklyRollup
+from .services import http, registry, routing_backends
+from .services.eld_export_service import EXPORT_COLUMNS, ELDExportService
+from .services.eld_service import ELDService
+from .services.road_graph import RoadGraph, build_synthetic_graph, haversine_meters, write_road_graph
+from .services.rollup_service import RollupService
+from .services.route_service import RouteService
+from .services.routing_backends import FallbackRoutingBackend, LocalRoutingBackend, RoutingBackend, RoutingError
+from .services.scenario_service import ScenarioService
+from .services.sequence_optimizer import adjacent_pairs, nearest_neighbour, optimize_sequence, path_cost
+from .services.single_flight import SingleFlight
 
-# Create your tests here.
+
+def osrm_route(distance, duration):
+    """OSRM shaped route response with a two point geometry"""
+    return {
+        "code": "Ok",
+        "routes": [{
+            "distance": distance,
+            "duration": duration,
+            "geometry": {"type": "LineString", "coordinates": [[-98.0, 39.0], [-97.0, 40.0]]},
+        }],
+    }
+
+
+class TripPlanningMemoizationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.trip = Trip.objects.create(
+            current_location="Dallas, TX",
+            pickup_location="Oklahoma City, OK",
+            dropoff_location="Denver, CO",
+            current_cycle_hours=2,
+        )
+
+    def plan(self, route_service):
+        geocodes = {
+            "Dallas, TX": {"lat": 32.78, "lon": -96.8, "display_name": "Dallas"},
+            "Oklahoma City, OK": {"lat": 35.47, "lon": -97.52, "display_name": "Oklahoma City"},
+            "Denver, CO": {"lat": 39.74, "lon": -104.99, "display_name": "Denver"},
+        }
+        routes = [osrm_route(330000, 4 * 3600), osrm_route(1000000, 10 * 3600)]
+        with mock.patch.object(RouteService, "geocode", side_effect=geocodes.get) as geocode, \
+                mock.patch.object(RouteService, "get_route", side_effect=routes) as get_route:
+            result = route_service.determine_routes_and_stops(Trip.objects.get(pk=self.trip.pk))
+        return result, geocode.call_count + get_route.call_count
+
+    def test_replanning_same_inputs_reuses_stored_plan(self):
+        route_service = RouteService()
+
+        first_result, first_calls = self.plan(route_service)
+        stop_count = RouteStop.objects.filter(trip=self.trip).count()
+        log_count = ELDLog.objects.filter(trip=self.trip).count()
+
+        second_result, second_calls = self.plan(route_service)
+
+        self.assertGreater(first_calls, 0)
+        self.assertEqual(second_calls, 0)
+        self.assertGreater(stop_count, 0)
+        self.assertEqual(RouteStop.objects.filter(trip=self.trip).count(), stop_count)
+        self.assertEqual(ELDLog.objects.filter(trip=self.trip).count(), log_count)
+        self.assertEqual(len(second_result["stops"]), len(first_result["stops"]))
+
+    def test_changed_inputs_replace_the_plan(self):
+        route_service = RouteService()
+        self.plan(route_service)
+        first_plan_hash = Trip.objects.get(pk=self.trip.pk).plan_hash
+
+        Trip.objects.filter(pk=self.trip.pk).update(current_cycle_hours=5)
+        result, calls = self.plan(route_service)
+
+        # Routes are memoized by location, only the stops are planned again
+        self.assertEqual(calls, 0)
+        self.assertNotEqual(Trip.objects.get(pk=self.trip.pk).plan_hash, first_plan_hash)
+        self.assertEqual(RouteStop.objects.filter(trip=self.trip).count(), len(result["stops"]))
+
+    def stored_stops(self):
+        stops = list(RouteStop.objects.filter(trip=self.trip).order_by("arrival_time", "id"))
+        start = stops[0].arrival_time
+
+        def hours(time):
+            return round((time - start).total_seconds() / 3600, 2)
+
+        return [(stop.stop_type, stop.location, hours(stop.arrival_time), hours(stop.departure_time)) for stop in stops]
+
+    def test_determine_route_stops_output(self):
+        self.plan(RouteService())
+
+        # 4 h to the pickup, then 10 h over 1000 km: the daily limit runs out
+        # 2.75 h into the second leg and the fuel stop falls at 1000 km overall
+        self.assertEqual(self.stored_stops(), [
+            ("start", "Dallas, TX", 0, 0),
+            ("pickup", "Oklahoma City, OK", 4, 5),
+            ("rest", "Resting Location 1", 7.75, 17.75),
+            ("fuel", "Fuel Stop 1", 21.7, 22.2),
+            ("dropoff", "Denver, CO", 25.5, 26.5),
+        ])
+
+    def test_cycle_restart_is_its_own_stop_type(self):
+        Trip.objects.filter(pk=self.trip.pk).update(current_cycle_hours=69)
+        self.plan(RouteService())
+
+        self.assertEqual(self.stored_stops()[:3], [
+            ("start", "Dallas, TX", 0, 0),
+            ("restart", "Restart Location 1", 0, 34),
+            ("pickup", "Oklahoma City, OK", 38, 39),
+        ])
+        statuses = [
+            event["status"]
+            for log in ELDLog.objects.filter(trip=self.trip)
+            for event in log.log_data["events"]
+            if event["location"] == "Restart Location 1"
+        ]
+        self.assertEqual(statuses, ["OFF"])
+
+        trip = Trip.objects.get(pk=self.trip.pk)
+        with mock.patch.object(RouteService, "get_route_details", return_value=cache.get(f"plan_details:{trip.plan_hash}")):
+            result = ScenarioService(RouteService(), ELDService()).evaluate_scenarios(
+                trip, [datetime.datetime(2026, 1, 5, 6, 0)], [69]
+            )
+        scenario = result["scenarios"][0]
+        self.assertEqual(scenario["restart_stops"], 1)
+        self.assertEqual(scenario["rest_stops"], RouteStop.objects.filter(trip=self.trip, stop_type="rest").count())
+
+    def test_routes_are_fetched_before_taking_the_row_lock(self):
+        events = []
+        atomic = transaction.atomic
+        get_route_details = RouteService.get_route_details
+
+        def recording_atomic(*args, **kwargs):
+            events.append("lock")
+            return atomic(*args, **kwargs)
+
+        def recording_get_route_details(route_service, trip):
+            events.append("route")
+            return get_route_details(route_service, trip)
+
+        with mock.patch.object(transaction, "atomic", recording_atomic), \
+                mock.patch.object(RouteService, "get_route_details", recording_get_route_details):
+            self.plan(RouteService())
+
+        # Django's own writes add atomic blocks of their own after the lock
+        self.assertEqual(events[:2], ["route", "lock"])
+        self.assertEqual(events.count("route"), 1)
+
+    def test_planning_errors_are_not_returned_as_success(self):
+        url = f"/api/v1/trips/{self.trip.pk}/determine_route_stops/"
+        for result, expected_status in [
+            ({"error": "No route from A to B"}, 400),
+            ({"error": "The trip is being planned by another request, retry later", "retry_later": True}, 409),
+        ]:
+            with mock.patch.object(RouteService, "determine_routes_and_stops", return_value=result):
+                response = self.client.post(url)
+            self.assertEqual(response.status_code, expected_status)
+            self.assertEqual(response.json(), {"error": result["error"]})
+
+
+class SingleFlightTests(SimpleTestCase):
+    def test_concurrent_calls_with_same_key_run_once(self):
+        flight = SingleFlight()
+        calls = []
+        started = threading.Event()
+
+        def compute():
+            calls.append(1)
+            started.set()
+            time.sleep(0.2)
+            return "result"
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(flight.do("key", compute))) for _ in range(8)]
+        threads[0].start()
+        started.wait()
+        for thread in threads[1:]:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ["result"] * 8)
+
+    def test_different_keys_run_separately(self):
+        flight = SingleFlight()
+        self.assertEqual(flight.do("a", lambda: 1), 1)
+        self.assertEqual(flight.do("b", lambda: 2), 2)
+
+    def test_errors_are_raised_to_the_caller(self):
+        flight = SingleFlight()
+
+        def fail():
+            raise ValueError("boom")
+
+        with self.assertRaises(ValueError):
+            flight.do("key", fail)
+
+
+def dijkstra_duration(graph, source, target):
+    """Plain one-directional Dijkstra, the reference for the A* search"""
+    best = {source: 0.0}
+    heap = [(0.0, source)]
+    settled = set()
+    while heap:
+        cost, node = heapq.heappop(heap)
+        if node == target:
+            return cost
+        if node in settled:
+            continue
+        settled.add(node)
+        for edge in range(graph.offsets[node], graph.offsets[node + 1]):
+            neighbour = graph.targets[edge]
+            new_cost = cost + graph.durations[edge]
+            if new_cost < best.get(neighbour, math.inf):
+                best[neighbour] = new_cost
+                heapq.heappush(heap, (new_cost, neighbour))
+    return None
+
+
+class RoadGraphTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "graph.bin")
+        self.nodes, self.edges = build_synthetic_graph(30, 30, seed=1)
+        write_road_graph(self.path, self.nodes, self.edges)
+        self.graph = RoadGraph(self.path)
+
+    def tearDown(self):
+        self.graph.close()
+        self.directory.cleanup()
+
+    def test_file_round_trip(self):
+        self.assertEqual(self.graph.node_count, len(self.nodes))
+        self.assertEqual(self.graph.edge_count, len(self.edges))
+        for node in (0, 17, len(self.nodes) - 1):
+            self.assertEqual((self.graph.lat[node], self.graph.lon[node]), self.nodes[node])
+
+        source, target, distance, duration = self.edges[5]
+        edge = self.graph._edge(source, target)
+        self.assertAlmostEqual(self.graph.distances[edge], distance, places=1)
+        self.assertAlmostEqual(self.graph.durations[edge], duration, places=2)
+
+    def test_rejects_files_that_are_not_road_graphs(self):
+        path = os.path.join(self.directory.name, "other.bin")
+        with open(path, "wb") as other_file:
+            other_file.write(b"\0" * 64)
+        with self.assertRaises(ValueError):
+            RoadGraph(path)
+
+    def test_shortest_path_matches_dijkstra(self):
+        rng = random.Random(7)
+        for _ in range(40):
+            source, target = rng.randrange(len(self.nodes)), rng.randrange(len(self.nodes))
+            path, duration, _ = self.graph.shortest_path(source, target)
+            self.assertEqual((path[0], path[-1]), (source, target))
+            self.assertAlmostEqual(duration, dijkstra_duration(self.graph, source, target), delta=1e-3)
+
+    def test_route_is_shaped_like_osrm(self):
+        start = {"lat": self.nodes[0][0], "lon": self.nodes[0][1]}
+        end = {"lat": self.nodes[-1][0], "lon": self.nodes[-1][1]}
+
+        route = self.graph.route(start, end)
+
+        self.assertEqual(route["code"], "Ok")
+        leg = route["routes"][0]
+        self.assertGreater(leg["distance"], 0)
+        self.assertGreater(leg["duration"], 0)
+        self.assertEqual(leg["geometry"]["type"], "LineString")
+        self.assertEqual(leg["geometry"]["coordinates"][0], [start["lon"], start["lat"]])
+        self.assertEqual(leg["geometry"]["coordinates"][-1], [end["lon"], end["lat"]])
+
+        route_details = RouteService()._determine_routes(route, route)
+        self.assertAlmostEqual(route_details["pickup_duration"], leg["duration"] / 3600)
+        self.assertAlmostEqual(route_details["total_distance"], 2 * leg["distance"] / 1000)
+
+    def test_nearest_node_matches_brute_force(self):
+        rng = random.Random(3)
+        for _ in range(30):
+            lat, lon = 39.0 + rng.uniform(-0.2, 0.5), -98.0 + rng.uniform(-0.2, 0.5)
+            expected = min(range(len(self.nodes)), key=lambda node: haversine_meters(lat, lon, *self.nodes[node]))
+            self.assertEqual(self.graph.nearest_node(lat, lon), expected)
+
+    def test_coordinates_outside_the_graph_have_no_route(self):
+        backend = LocalRoutingBackend(self.path, max_snap_meters=25000)
+        inside = {"lat": self.nodes[0][0], "lon": self.nodes[0][1]}
+        self.addCleanup(lambda: backend.graph.close())
+
+        for outside in ({"lat": 41.0, "lon": -90.0}, {"lat": 45.0, "lon": -80.0}, {"lat": 21.3, "lon": -157.8}):
+            started = time.perf_counter()
+            with self.assertRaises(RoutingError):
+                backend.route(inside, outside)
+            with self.assertRaises(RoutingError):
+                backend.table([inside, outside])
+            self.assertLess(time.perf_counter() - started, 1)
+
+
+class StubRoutingBackend(RoutingBackend):
+    def __init__(self, name, route=None):
+        self.name = name
+        self._route = route
+        self.calls = 0
+
+    def route(self, start_coords, end_coords):
+        self.calls += 1
+        if self._route is None:
+            raise RoutingError(f"{self.name} is down")
+        return self._route
+
+
+class FallbackRoutingBackendTests(SimpleTestCase):
+    start = {"lat": 39.0, "lon": -98.0}
+    end = {"lat": 40.0, "lon": -97.0}
+
+    def test_falls_back_when_osrm_fails(self):
+        osrm = StubRoutingBackend("osrm")
+        local = StubRoutingBackend("local", route=osrm_route(1000, 60))
+
+        route = FallbackRoutingBackend([osrm, local]).route(self.start, self.end)
+
+        self.assertEqual(route, osrm_route(1000, 60))
+        self.assertEqual((osrm.calls, local.calls), (1, 1))
+
+    def test_uses_first_backend_when_it_answers(self):
+        osrm = StubRoutingBackend("osrm", route=osrm_route(2000, 120))
+        local = StubRoutingBackend("local", route=osrm_route(1000, 60))
+
+        route = FallbackRoutingBackend([osrm, local]).route(self.start, self.end)
+
+        self.assertEqual(route, osrm_route(2000, 120))
+        self.assertEqual(local.calls, 0)
+
+    def test_raises_when_every_backend_fails(self):
+        backend = FallbackRoutingBackend([StubRoutingBackend("osrm"), StubRoutingBackend("local")])
+        with self.assertRaises(RoutingError):
+            backend.route(self.start, self.end)
+
+
+class SequenceOptimizerTests(SimpleTestCase):
+    def random_trip(self, rng, stop_count):
+        """Asymmetric duration matrix and groups: start, pickups, dropoffs, final dropoff"""
+        points = [(rng.uniform(0, 1000), rng.uniform(0, 1000)) for _ in range(stop_count + 2)]
+        matrix = [
+            [math.dist(a, b) * rng.uniform(1.0, 1.4) for b in points]
+            for a in points
+        ]
+        split = rng.randint(1, stop_count)
+        groups = [[0], list(range(1, split + 1)), list(range(split + 1, stop_count + 1)), [stop_count + 1]]
+        return matrix, groups
+
+    def test_order_respects_groups_and_never_loses_to_nearest_neighbour(self):
+        rng = random.Random(3)
+        for _ in range(300):
+            stop_count = rng.randint(1, 12)
+            matrix, groups = self.random_trip(rng, stop_count)
+
+            order = optimize_sequence(matrix, groups)
+
+            self.assertEqual(order[0], 0)
+            self.assertEqual(order[-1], stop_count + 1)
+            position = 0
+            for group in groups:
+                self.assertEqual(sorted(order[position:position + len(group)]), sorted(group))
+                position += len(group)
+            self.assertLessEqual(path_cost(matrix, order), path_cost(matrix, nearest_neighbour(matrix, groups)) + 1e-9)
+
+    def test_keeps_greedy_order_when_evaluation_is_worse(self):
+        matrix, groups = self.random_trip(random.Random(5), 10)
+        greedy = nearest_neighbour(matrix, groups)
+
+        order = optimize_sequence(matrix, groups, evaluate=lambda order: 0 if order == greedy else 1)
+
+        self.assertEqual(order, greedy)
+
+    def test_adjacent_pairs_stay_within_or_move_to_next_group(self):
+        pairs = adjacent_pairs([[0], [1, 2], [], [3]])
+        self.assertEqual(pairs, {(0, 1), (0, 2), (1, 2), (2, 1), (1, 3), (2, 3)})
+
+
+class MultiStopRouteDetailsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_unreachable_required_pair_is_an_error_without_scoring(self):
+        trip = Trip.objects.create(
+            current_location="A", pickup_location="B", dropoff_location="D", current_cycle_hours=0
+        )
+        TripWaypoint.objects.create(trip=trip, location="C", stop_type="pickup")
+        coords = {"lat": 39.0, "lon": -98.0}
+        matrix = {
+            "points": [
+                {"location": location, "stop_type": stop_type, "coords": coords}
+                for location, stop_type in [("A", "start"), ("B", "pickup"), ("C", "pickup"), ("D", "dropoff")]
+            ],
+            # C cannot reach D
+            "durations": [[0, 60, 60, 60], [60, 0, 60, 60], [60, 60, 0, None], [60, 60, 60, 0]],
+            "distances": [[0, 1, 1, 1], [1, 0, 1, 1], [1, 1, 0, None], [1, 1, 1, 0]],
+        }
+        route_service = RouteService()
+
+        with mock.patch.object(RouteService, "_fetch_route_matrix", return_value=matrix), \
+                mock.patch.object(RouteService, "_determine_leg_stops") as determine_leg_stops:
+            route_details = route_service.get_route_details(trip)
+
+        self.assertEqual(route_details, {"error": "No route from C to D"})
+        determine_leg_stops.assert_not_called()
+
+
+class ScenarioServiceTests(SimpleTestCase):
+    def route_details(self, pickup_hours, dropoff_hours):
+        return {
+            "total_distance": (pickup_hours + dropoff_hours) * 90,
+            "total_duration": pickup_hours + dropoff_hours,
+            "pickup_distance": pickup_hours * 90,
+            "pickup_duration": pickup_hours,
+            "dropoff_distance": dropoff_hours * 90,
+            "dropoff_duration": dropoff_hours,
+        }
+
+    def test_eta_never_decreases_as_cycle_hours_increase(self):
+        trip = Trip(current_location="A", pickup_location="B", dropoff_location="C", current_cycle_hours=0)
+        route_service = RouteService()
+        scenario_service = ScenarioService(route_service, ELDService())
+        departure = datetime.datetime(2026, 1, 5, 6, 0, tzinfo=datetime.timezone.utc)
+        cycle_hours_values = [hours / 2 for hours in range(141)]
+
+        for pickup_hours, dropoff_hours in [(0.5, 3), (4, 10), (2, 30), (12, 60)]:
+            with mock.patch.object(
+                RouteService, "get_route_details", return_value=self.route_details(pickup_hours, dropoff_hours)
+            ):
+                result = scenario_service.evaluate_scenarios(trip, [departure], cycle_hours_values)
+
+            etas = [scenario["eta"] for scenario in result["scenarios"]]
+            self.assertEqual(len(etas), len(cycle_hours_values))
+            for earlier, later in zip(etas, etas[1:]):
+                self.assertLessEqual(earlier, later)
+            self.assertGreaterEqual(etas[0], departure + datetime.timedelta(hours=pickup_hours + dropoff_hours))
+
+    def test_multi_stop_eta_never_decreases_as_cycle_hours_increase(self):
+        trip = Trip(current_location="A", current_cycle_hours=0)
+        route_service = RouteService()
+        departure = datetime.datetime(2026, 1, 5, 6, 0)
+        rng = random.Random(7)
+        # Resting 10 hours here before the cycle runs out used to finish 10 hours later than restarting
+        trips = [[
+            {"location": "B", "stop_type": "dropoff", "duration": 23.23, "distance": 0},
+            {"location": "C", "stop_type": "dropoff", "duration": 19.76, "distance": 987.85},
+        ]]
+        for _ in range(6):
+            trips.append([
+                {
+                    "location": "B",
+                    "stop_type": rng.choice(["pickup", "dropoff"]),
+                    "duration": (hours := rng.uniform(0.5, 30)),
+                    "distance": hours * rng.choice([0, 50, 90]),
+                }
+                for _ in range(rng.randint(1, 4))
+            ])
+
+        for legs in trips:
+            etas = [
+                route_service._determine_leg_stops(trip, legs, departure, hours / 4)[-1]["arrival_time"]
+                for hours in range(281)
+            ]
+            for earlier, later in zip(etas, etas[1:]):
+                # Allow for timedelta rounding of the float hours
+                self.assertLessEqual(earlier, later + datetime.timedelta(milliseconds=1))
+
+    def test_stops_never_start_before_departure(self):
+        trip = Trip(current_location="A", pickup_location="B", dropoff_location="C", current_cycle_hours=40)
+        departure = datetime.datetime(2026, 1, 5, 6, 0)
+
+        stops = RouteService().plan_stops(trip, self.route_details(4, 10), start_time=departure)
+
+        for stop in stops:
+            self.assertGreaterEqual(stop["arrival_time"], departure)
+            self.assertGreaterEqual(stop["departure_time"], stop["arrival_time"])
+
+
+class RegistryTests(SimpleTestCase):
+    def test_cold_scenario_service_lookup_does_not_deadlock(self):
+        with mock.patch.dict(registry._instances, clear=True):
+            thread = threading.Thread(target=registry.get_scenario_service, daemon=True)
+            thread.start()
+            thread.join(timeout=5)
+
+            self.assertFalse(thread.is_alive())
+            self.assertIn("scenario_service", registry._instances)
+
+    def test_warm_up_builds_the_services_and_the_snapping_index(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "graph.bin")
+        write_road_graph(path, *build_synthetic_graph(5, 5))
+        self.addCleanup(routing_backends._get_local_backend.cache_clear)
+
+        with mock.patch.dict(registry._instances, clear=True), \
+                override_settings(ROUTING_BACKEND="local", ROUTING_GRAPH_PATH=path):
+            registry.warm_up_services()
+
+            self.assertEqual(
+                set(registry._instances), {"route_service", "eld_service", "rollup_service", "scenario_service"}
+            )
+            graph = registry.get_route_service().routing_backend.graph
+            self.addCleanup(graph.close)
+            self.assertIsNotNone(graph._grid)
+
+
+class HttpSessionTests(SimpleTestCase):
+    def test_every_thread_gets_the_same_session(self):
+        with mock.patch.object(http, "_session", None):
+            sessions = []
+            threads = [threading.Thread(target=lambda: sessions.append(http.get_http_session())) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            self.assertEqual(len(sessions), 8)
+            self.assertTrue(all(session is sessions[0] for session in sessions))
+            self.assertIs(http.get_http_session(), sessions[0])
+
+
+class StartupBenchmarkTests(SimpleTestCase):
+    def test_first_request_goes_through_the_services(self):
+        stdout = io.StringIO()
+        call_command("benchmark_startup", "--runs", "1", "--warm-up", "--graph-size", "10", stdout=stdout)
+
+        self.assertIn("first_request", stdout.getvalue())
+        self.assertIn("cold_start", stdout.getvalue())
+
+
+def eld_log(carrier, miles, driving_hours, violations=0):
+    return {
+        "carrier": carrier,
+        "miles_driven": miles,
+        "hours_summary": {"driving": driving_hours, "total_on_duty": driving_hours + 1},
+        "hos_violations": ["violation"] * violations,
+    }
+
+
+class RollupServiceTests(TestCase):
+    def setUp(self):
+        self.rollup_service = RollupService()
+        self.monday = datetime.date(2026, 1, 5)
+
+    def test_deltas_add_up_and_removals_never_create_rows(self):
+        logs = [(self.monday, eld_log("ACME", 300, 6)), (self.monday + datetime.timedelta(days=1), eld_log("ACME", 200, 4, 1))]
+
+        self.rollup_service.apply_logs(logs)
+        self.rollup_service.apply_logs(logs[:1])
+        self.rollup_service.apply_logs(logs[:1], sign=-1)
+        self.rollup_service.apply_logs([(self.monday, eld_log("Unknown", 100, 2))], sign=-1)
+
+        daily = FleetDailyRollup.objects.get(carrier="ACME", date=self.monday)
+        self.assertEqual((daily.log_count, daily.miles_driven, daily.driving_hours), (1, 300, 6))
+        weekly = FleetWeeklyRollup.objects.get(carrier="ACME", week_start=self.monday)
+        self.assertEqual((weekly.log_count, weekly.miles_driven, weekly.violations), (2, 500, 1))
+        self.assertEqual((weekly.iso_year, weekly.iso_week), (2026, 2))
+        self.assertFalse(FleetDailyRollup.objects.filter(carrier="Unknown").exists())
+        self.assertFalse(FleetWeeklyRollup.objects.filter(log_count__lt=0).exists())
+
+    def test_rebuild_matches_incremental_rollups(self):
+        trip = Trip.objects.create(current_location="A", pickup_location="B", dropoff_location="C", current_cycle_hours=0)
+        logs = []
+        for day in range(10):
+            date = self.monday + datetime.timedelta(days=day)
+            log_data = eld_log("ACME" if day % 2 else "Globex", 100 + day, 5 + day % 3, day % 2)
+            ELDLog.objects.create(trip=trip, date=date, log_data=log_data)
+            logs.append((date, log_data))
+        self.rollup_service.apply_logs(logs)
+
+        def totals():
+            return (
+                sorted(FleetDailyRollup.objects.values_list("carrier", "date", "log_count", "miles_driven", "violations")),
+                sorted(FleetWeeklyRollup.objects.values_list("carrier", "week_start", "log_count", "miles_driven", "violations")),
+            )
+
+        incremental = totals()
+        result = self.rollup_service.rebuild(chunk_size=3)
+
+        self.assertEqual(totals(), incremental)
+        self.assertEqual(result, {"logs": 10, "daily_rollups": 10, "weekly_rollups": 4, "corrected_rollups": 0})
+
+    def test_rebuild_corrects_drift_without_losing_concurrent_deltas(self):
+        trip = Trip.objects.create(current_location="A", pickup_location="B", dropoff_location="C", current_cycle_hours=0)
+        logs = []
+        for day in range(14):
+            date = self.monday + datetime.timedelta(days=day)
+            log_data = eld_log("ACME", 100, 5)
+            ELDLog.objects.create(trip=trip, date=date, log_data=log_data)
+            logs.append((date, log_data))
+        self.rollup_service.apply_logs(logs[:10])
+        FleetDailyRollup.objects.filter(date=self.monday).update(miles_driven=999)
+        FleetWeeklyRollup.objects.filter(week_start=self.monday).update(log_count=42)
+
+        rebuild_week = RollupService._rebuild_week
+        late_log = (self.monday + datetime.timedelta(days=9), eld_log("Globex", 50, 2))
+
+        def rebuild_week_then_plan(rollup_service, week_start, chunk_size):
+            counts = rebuild_week(rollup_service, week_start, chunk_size)
+            if week_start == self.monday:
+                # A trip planned while the rebuild is between weeks
+                ELDLog.objects.create(trip=trip, date=late_log[0], log_data=late_log[1])
+                rollup_service.apply_logs([late_log])
+            return counts
+
+        with mock.patch.object(RollupService, "_rebuild_week", rebuild_week_then_plan):
+            self.rollup_service.rebuild(chunk_size=2)
+
+        expected_daily, expected_weekly = RollupService()._aggregate(logs + [late_log])
+        for (carrier, date), metrics in expected_daily.items():
+            row = FleetDailyRollup.objects.get(carrier=carrier, date=date)
+            self.assertEqual((row.log_count, row.miles_driven), (metrics["log_count"], metrics["miles_driven"]))
+        for (carrier, week_start, _, _), metrics in expected_weekly.items():
+            row = FleetWeeklyRollup.objects.get(carrier=carrier, week_start=week_start)
+            self.assertEqual((row.log_count, row.miles_driven), (metrics["log_count"], metrics["miles_driven"]))
+        self.assertEqual(FleetDailyRollup.objects.count(), len(expected_daily))
+
+
+class ELDExportTests(TestCase):
+    def setUp(self):
+        self.trip = Trip.objects.create(current_location="A", pickup_location="B", dropoff_location="C", current_cycle_hours=0)
+        self.day = datetime.date(2026, 1, 5)
+        self.logs = []
+        # Three logs on the same date straddle the chunk boundary
+        for offset, carrier in [(0, "ACME"), (0, "Globex"), (0, "ACME"), (1, "ACME"), (2, "Globex"), (9, "ACME")]:
+            self.logs.append(ELDLog.objects.create(
+                trip=self.trip,
+                date=self.day + datetime.timedelta(days=offset),
+                log_data={
+                    "carrier": carrier,
+                    "driver_name": "Sam",
+                    "events": [
+                        {"time": "06:00", "status": "ON", "location": "Dallas, TX", "remarks": "Pre-trip"},
+                        {"time": "07:00", "status": "D", "location": "Waco, TX", "remarks": "Fuel, then\nscale"},
+                    ],
+                },
+            ))
+
+    def export(self, export_format, carrier=None):
+        return "".join(ELDExportService(chunk_size=2).iter_export(
+            self.day, self.day + datetime.timedelta(days=2), export_format, carrier
+        ))
+
+    def test_keyset_pagination_returns_every_log_once_in_order(self):
+        logs = list(ELDExportService(chunk_size=2).iter_logs(self.day, self.day + datetime.timedelta(days=2)))
+
+        self.assertEqual([log[0] for log in logs], [log.id for log in self.logs[:5]])
+        self.assertEqual([log[2] for log in logs], sorted(log[2] for log in logs))
+
+    def test_carrier_filter(self):
+        logs = list(ELDExportService(chunk_size=2).iter_logs(self.day, self.day + datetime.timedelta(days=2), "Globex"))
+
+        self.assertEqual([log[0] for log in logs], [self.logs[1].id, self.logs[4].id])
+
+    def test_csv_has_a_header_and_one_flat_row_per_event(self):
+        rows = list(csv.DictReader(io.StringIO(self.export("csv"), newline="")))
+
+        self.assertEqual(list(rows[0]), EXPORT_COLUMNS)
+        self.assertEqual(len(rows), 10)
+        self.assertEqual(rows[1]["log_id"], str(self.logs[0].id))
+        self.assertEqual(rows[1]["carrier"], "ACME")
+        self.assertEqual(rows[1]["event_index"], "1")
+        self.assertEqual(rows[1]["remarks"], "Fuel, then\nscale")
+
+    def test_ndjson_has_one_line_per_event(self):
+        lines = self.export("ndjson", carrier="ACME").splitlines()
+
+        self.assertEqual(len(lines), 6)
+        self.assertEqual(json.loads(lines[0])["status"], "ON")
+        self.assertEqual({json.loads(line)["carrier"] for line in lines}, {"ACME"})
+
+    def test_start_after_end_is_rejected(self):
+        response = self.client.get("/api/v1/eld-logs/export/", {"start_date": "2026-01-09", "end_date": "2026-01-05"})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_view_streams_the_export(self):
+        response = self.client.get(
+            "/api/v1/eld-logs/export/", {"start_date": "2026-01-05", "end_date": "2026-01-07", "export_format": "ndjson"}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertEqual(len(b"".join(response.streaming_content).splitlines()), 10)
+
+    def test_command_counts_rows_not_lines(self):
+        with tempfile.TemporaryDirectory() as directory:
+            stderr = io.StringIO()
+            call_command(
+                "export_eld_logs", "2026-01-05", "2026-01-07", "--chunk-size", "2",
+                "--output", os.path.join(directory, "logs.csv"), stderr=stderr,
+            )
+
+        self.assertIn("Exported 10 rows", stderr.getvalue())
@@ -1,10 +1,13 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import TripViewSet
+from .views import TripViewSet, ELDLogExportView, FleetDailyRollupViewSet, FleetWeeklyRollupViewSet
 
 router = DefaultRouter()
 router.register(r'trips', TripViewSet)
+router.register(r'fleet-rollups/daily', FleetDailyRollupViewSet)
+router.register(r'fleet-rollups/weekly', FleetWeeklyRollupViewSet)
 
 urlpatterns = [
+    path('v1/eld-logs/export/', ELDLogExportView.as_view(), name='eld-log-export'),
     path('v1/', include(router.urls)),
 ]
\ No newline at end of file
@@ -1,15 +1,29 @@
 from django.shortcuts import render
 from rest_framework import viewsets, status
-from .models import Trip, RouteStop
-from .serializers import TripSerializer
+from django.db import transaction
+from .models import Trip, RouteStop, FleetDailyRollup, FleetWeeklyRollup
+from django.utils import timezone
+from django.http import StreamingHttpResponse
+from rest_framework.views import APIView
+from .serializers import (
+    TripSerializer, TripScenarioRequestSerializer, TripScenarioSerializer, ELDLogExportQuerySerializer,
+    FleetDailyRollupSerializer, FleetWeeklyRollupSerializer,
+)
 from rest_framework.decorators import action
-from .services.route_service import RouteService
+from .services.eld_export_service import ELDExportService
+from .services.registry import get_rollup_service, get_route_service, get_scenario_service
 from rest_framework.response import Response
 
 class TripViewSet(viewsets.ModelViewSet):
     queryset = Trip.objects.all()
     serializer_class = TripSerializer
     
+    def perform_destroy(self, instance):
+        # Keep the fleet rollups in sync with the logs deleted with the trip
+        with transaction.atomic():
+            get_rollup_service().apply_logs(instance.eld_logs.values_list('date', 'log_data'), sign=-1)
+            instance.delete()
+    
     @action(detail=True, methods=['post'])
     def determine_route_stops(self, request, pk=None):
         """Determine route with stops"""
@@ -17,10 +31,85 @@ class TripViewSet(viewsets.ModelViewSet):
         
         print(f"Current trip: {str(trip)}")
         
-        route_service = RouteService()
+        route_service = get_route_service()
         route_result = route_service.determine_routes_and_stops(trip)
+        if "error" in route_result:
+            # Another request holds or just changed the trip, the client may retry
+            error_status = status.HTTP_409_CONFLICT if route_result.get("retry_later") else status.HTTP_400_BAD_REQUEST
+            return Response({"error": route_result["error"]}, status=error_status)
         
         serializer = self.get_serializer(trip)
         return Response(serializer.data)
     
-    
\ No newline at end of file
+    @action(detail=True, methods=['post'])
+    def scenarios(self, request, pk=None):
+        """Evaluate departure time x cycle hours what-if scenarios for a trip"""
+        trip = self.get_object()
+        
+        request_serializer = TripScenarioRequestSerializer(data=request.data)
+        request_serializer.is_valid(raise_exception=True)
+        departure_times = request_serializer.validated_data.get('departure_times', [timezone.now()])
+        cycle_hours_values = request_serializer.validated_data.get('current_cycle_hours', [trip.current_cycle_hours])
+        
+        scenario_service = get_scenario_service()
+        result = scenario_service.evaluate_scenarios(trip, departure_times, cycle_hours_values)
+        if "error" in result:
+            return Response(result, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            "trip": trip.id,
+            "route_details": result["route_details"],
+            "scenarios": TripScenarioSerializer(result["scenarios"], many=True).data
+        })
+
+
+class ELDLogExportView(APIView):
+    content_types = {
+        "csv": "text/csv",
+        "ndjson": "application/x-ndjson",
+    }
+    
+    def get(self, request):
+        """Stream the ELD logs of a date range as CSV or NDJSON, one row per event"""
+        query_serializer = ELDLogExportQuerySerializer(data=request.query_params)
+        query_serializer.is_valid(raise_exception=True)
+        query = query_serializer.validated_data
+        
+        export_service = ELDExportService()
+        response = StreamingHttpResponse(
+            export_service.iter_export(
+                query['start_date'], query['end_date'], query['export_format'], query.get('carrier')
+            ),
+            content_type=self.content_types[query['export_format']]
+        )
+        filename = f"eld_logs_{query['start_date']}_{query['end_date']}.{query['export_format']}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+class FleetRollupViewSet(viewsets.ReadOnlyModelViewSet):
+    """Fleet totals per period, filtered by start_date, end_date and carrier query params"""
+    date_field = None
+    
+    def get_queryset(self):
+        queryset = self.queryset
+        params = self.request.query_params
+        if params.get('carrier'):
+            queryset = queryset.filter(carrier=params['carrier'])
+        if params.get('start_date'):
+            queryset = queryset.filter(**{f"{self.date_field}__gte": params['start_date']})
+        if params.get('end_date'):
+            queryset = queryset.filter(**{f"{self.date_field}__lte": params['end_date']})
+        return queryset.order_by(self.date_field, 'carrier')
+
+
+class FleetDailyRollupViewSet(FleetRollupViewSet):
+    queryset = FleetDailyRollup.objects.all()
+    serializer_class = FleetDailyRollupSerializer
+    date_field = 'date'
+
+
+class FleetWeeklyRollupViewSet(FleetRollupViewSet):
+    queryset = FleetWeeklyRollup.objects.all()
+    serializer_class = FleetWeeklyRollupSerializer
+    date_field = 'week_start'
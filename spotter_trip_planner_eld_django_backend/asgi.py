@@ -14,3 +14,9 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'spotter_trip_planner_eld_django_backend.settings')
 
 application = get_asgi_application()
+
+from django.conf import settings
+
+if settings.WARM_UP_SERVICES:
+    from api_trip.services.registry import warm_up_services
+    warm_up_services(open_connections=settings.WARM_UP_OPEN_CONNECTIONS)
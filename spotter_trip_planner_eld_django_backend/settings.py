@@ -136,3 +136,31 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Trip planning
+
+OPENCAGE_API_KEY = os.getenv('OPENCAGE_API_KEY', '')
+GEOCODE_URL = os.getenv('GEOCODE_URL', 'https://api.opencagedata.com/geocode/v1/json')
+GEOCODE_TIMEOUT = float(os.getenv('GEOCODE_TIMEOUT', 10))
+# Routes are memoized in the default cache, keyed by a hash of the trip locations
+
+ROUTE_CACHE_TIMEOUT = int(os.getenv('ROUTE_CACHE_TIMEOUT', 60 * 60 * 24))
+# Attempts to take the trip row lock before giving up on a plan request
+PLAN_LOCK_ATTEMPTS = int(os.getenv('PLAN_LOCK_ATTEMPTS', 2))
+MAX_TRIP_SCENARIOS = int(os.getenv('MAX_TRIP_SCENARIOS', 1000))
+
+# Routing backend: 'osrm' (falls back to the local road graph when one is set) or 'local'
+
+ROUTING_BACKEND = os.getenv('ROUTING_BACKEND', 'osrm')
+ROUTING_GRAPH_PATH = os.getenv('ROUTING_GRAPH_PATH', '')
+# Locations farther than this from every road graph node have no local route
+ROUTING_MAX_SNAP_METERS = float(os.getenv('ROUTING_MAX_SNAP_METERS', 25000))
+OSRM_BASE_URL = os.getenv('OSRM_BASE_URL', 'http://router.project-osrm.org/route/v1/driving')
+OSRM_TABLE_URL = os.getenv('OSRM_TABLE_URL', 'http://router.project-osrm.org/table/v1/driving')
+OSRM_TIMEOUT = float(os.getenv('OSRM_TIMEOUT', 10))
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', 10))
+
+# Build the shared services (and optionally open HTTP connections) when the worker starts
+
+WARM_UP_SERVICES = os.getenv('WARM_UP_SERVICES', 'false').lower() == 'true'
+WARM_UP_OPEN_CONNECTIONS = os.getenv('WARM_UP_OPEN_CONNECTIONS', 'false').lower() == 'true'